@@ -0,0 +1,30 @@
+"""
+Pydantic models for API request payloads.
+
+Webhook bodies are decoded with orjson and only their envelope fields are
+validated into a model; the decoded dict itself is what the services receive,
+so large payloads are never copied back out of a model.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class WebhookEvent(BaseModel):
+    """
+    Envelope of an event delivered to the reviewer webhook.
+
+    Only the fields used for dispatching are declared. Event-specific data
+    (push commits, PR diff content, ...) is ignored by the model and stays in
+    the decoded payload, which is handed to the services unchanged.
+
+    Attributes:
+        event: Event type (installation, push, review)
+        installation_id: GitHub App installation ID for installation events
+        repositories: Full names (owner/repo) of repositories to index
+    """
+
+    event: Optional[str] = None
+    installation_id: Optional[int] = None
+    repositories: List[str] = []
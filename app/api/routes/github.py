@@ -5,21 +5,70 @@ This module contains routes for handling GitHub webhook events, including
 installation events, push events, and pull request review events.
 """
 
-import json
-
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+import orjson
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+)
+from pydantic import ValidationError
 
+from app.api.models import WebhookEvent
 from app.core.config import Settings, get_settings
 from app.core.logging_config import get_logger
+from app.github.webhook_utils import verify_webhook_signature
 from app.services.github_service import (
     handle_pull_request_event,
-    process_installation_event,
+    process_installation_batch,
     process_push_event,
 )
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# GitHub event types (X-GitHub-Event header) that never lead to indexing or a
+# review. Dispatching uses the event named in the body, which the relay may
+# map from a different header event (e.g. pull_request to review), so only
+# known noise is ignored up front; everything else is read and dispatched.
+_IGNORED_HEADER_EVENTS = frozenset(
+    {
+        "check_run",
+        "check_suite",
+        "deployment",
+        "deployment_status",
+        "fork",
+        "gollum",
+        "issue_comment",
+        "issues",
+        "label",
+        "member",
+        "meta",
+        "milestone",
+        "page_build",
+        "ping",
+        "project",
+        "public",
+        "release",
+        "star",
+        "status",
+        "watch",
+        "workflow_job",
+        "workflow_run",
+    }
+)
+
+# Pre-encoded bodies for the constant acceptance responses. Only the bytes are
+# shared; a fresh Response is built per request since FastAPI mutates it.
+_PUSH_ACCEPTED_BODY = orjson.dumps(
+    {"status": "accepted", "message": "Push event accepted for indexing."}
+)
+_REVIEW_ACCEPTED_BODY = orjson.dumps(
+    {"status": "accepted", "message": "PR event accepted for review."}
+)
+
 
 @router.post("/reviewer")
 async def github_webhook(
@@ -31,7 +80,9 @@ async def github_webhook(
     Receives and processes webhook events from GitHub.
 
     This endpoint handles different types of GitHub events and delegates processing
-    to appropriate background tasks.
+    to appropriate background tasks. Events announced in the X-GitHub-Event header
+    that are known never to need handling (pings, stars, CI status, ...) are
+    ignored before the body is read or verified.
 
     Args:
         request: The incoming HTTP request
@@ -42,29 +93,39 @@ async def github_webhook(
         Dict[str, str]: Status response with message
 
     Raises:
-        HTTPException: If request payload is invalid or missing required data
+        HTTPException: If the signature check fails or the payload is invalid
+            or missing required data
     """
+    header_event = request.headers.get("X-GitHub-Event")
+    if header_event in _IGNORED_HEADER_EVENTS:
+        logger.debug("Ignoring unhandled event type from header: %s", header_event)
+        return {
+            "status": "ignored",
+            "message": f"Event '{header_event}' not processed.",
+        }
+
     try:
-        payload_body = await request.body()
-        payload = json.loads(payload_body)
-        event = payload.get("event")
+        payload_body = await verify_webhook_signature(request)
+        payload = orjson.loads(payload_body)
+        # Type only the dispatch fields; the services get the decoded dict
+        envelope = WebhookEvent.model_validate(payload)
+        event = envelope.event
 
         if not event:
             raise HTTPException(status_code=400, detail="Event type missing in payload")
 
-        logger.info(f"Received webhook event: {event}", extra={"event_type": event})
+        logger.info("Received webhook event: %s", event, extra={"event_type": event})
 
         match event:
             case "installation":
-                installation_id = payload.get("installation_id")
-                if not installation_id:
+                if not envelope.installation_id:
                     raise HTTPException(
                         status_code=400, detail="Installation ID missing"
                     )
 
-                repositories = payload.get("repositories", [])
-                for repo in repositories:
-                    background_tasks.add_task(process_installation_event, repo)
+                repositories = envelope.repositories
+                if repositories:
+                    background_tasks.add_task(process_installation_batch, repositories)
 
                 return {
                     "status": "accepted",
@@ -73,28 +134,31 @@ async def github_webhook(
 
             case "push":
                 background_tasks.add_task(process_push_event, payload)
-                return {
-                    "status": "accepted",
-                    "message": "Push event accepted for indexing.",
-                }
+                return Response(
+                    content=_PUSH_ACCEPTED_BODY, media_type="application/json"
+                )
 
             case "review":
                 background_tasks.add_task(handle_pull_request_event, payload)
-                return {
-                    "status": "accepted",
-                    "message": "PR event accepted for review.",
-                }
+                return Response(
+                    content=_REVIEW_ACCEPTED_BODY, media_type="application/json"
+                )
 
             case _:
-                logger.warning(f"Unhandled event type: {event}")
+                logger.warning("Unhandled event type: %s", event)
                 return {
                     "status": "ignored",
                     "message": f"Event '{event}' not processed.",
                 }
 
-    except json.JSONDecodeError:
+    except HTTPException:
+        raise
+    except orjson.JSONDecodeError:
         logger.error("Failed to parse webhook payload as JSON")
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    except ValidationError as e:
+        logger.error("Invalid webhook payload: %s", e)
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
     except Exception as e:
-        logger.exception(f"Error processing webhook: {str(e)}")
+        logger.exception("Error processing webhook: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -25,10 +25,36 @@ class Settings(BaseSettings):
         REPO_CLONE_DIR: Directory where Git repositories are cloned
         LANCEDB_PATH: Path to LanceDB storage
         EMBEDDING_MODEL_NAME: Name of the embedding model to use
+        EMBEDDING_BATCH_SIZE: Number of chunks encoded per embedding forward pass
+        EMBEDDING_DEVICE: Torch device for embedding inference; auto-detected
+            (cuda, then mps, then cpu) when unset
+        EMBEDDING_PRECISION: Inference precision of the embedding model (auto,
+            fp32, fp16, bf16, int8); auto uses fp16 on CUDA and fp32 elsewhere.
+            int8 is CPU-only and opt-in; reindex after switching to it
+        EMBEDDING_BACKEND: Embedding inference runtime, "torch" or "onnx"; onnx
+            needs the project's "onnx" extra (optimum and ONNX Runtime)
+        EMBEDDING_NUM_THREADS: Intra-op thread count for embedding inference (torch
+            and ONNX Runtime)
+        EMBEDDING_WARMUP: Load and warm up the embedding model at application startup
+        STORE_CHUNK_CODE: Store chunk source text in the vector index; when False
+            only the line range is stored and the code is read from the clone
+        VECTOR_INDEX_MIN_ROWS: Row count from which a repository table gets a
+            scalar-quantized ANN index; 0 disables the index
+        MAX_FILE_BYTES: Python files larger than this are not indexed (generated
+            code, fixtures); empty files are always skipped
+        CHUNK_CACHE_PATH: SQLite file caching the chunks parsed from each source
+            file, so unchanged files are not parsed again; empty disables it
+        EMBEDDING_CACHE_PATH: SQLite file caching chunk embeddings by model and
+            content hash, so unchanged chunks are not encoded again; empty
+            disables it
         CHAT_MODEL_NAME: Name of the chat model for LLM operations
         SENTENCE_TRANSFORMERS_HOME: Optional cache directory for sentence transformers
         LOG_LEVEL: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         WEBHOOK_URL: URL for webhook notifications
+        GITHUB_WEBHOOK_SECRET: Secret used to validate GitHub webhook signatures
+        INSTALLATION_INDEX_CONCURRENCY: Max repositories of one installation event
+            indexed at the same time. Each full index runs its own parse process
+            pool and embedding stream, so keep this small
         ENVIRONMENT: Environment configuration (development, staging, production)
     """
 
@@ -36,6 +62,17 @@ class Settings(BaseSettings):
     REPO_CLONE_DIR: str = "./repos"
     LANCEDB_PATH: str = "./lancedb_data/db"
     EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_DEVICE: Optional[str] = None
+    EMBEDDING_PRECISION: str = "auto"
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_NUM_THREADS: int = 4
+    EMBEDDING_WARMUP: bool = True
+    STORE_CHUNK_CODE: bool = True
+    VECTOR_INDEX_MIN_ROWS: int = 50_000
+    MAX_FILE_BYTES: int = 2_000_000
+    CHUNK_CACHE_PATH: str = "./lancedb_data/chunk_cache.sqlite3"
+    EMBEDDING_CACHE_PATH: str = "./lancedb_data/embedding_cache.sqlite3"
     CHAT_MODEL_NAME: str = "qwen2.5-coder:7b"  # Default chat model for LLM
 
     # Environment configuration
@@ -47,6 +84,10 @@ class Settings(BaseSettings):
     # External service URLs
     WEBHOOK_URL: str = ""
 
+    # GitHub webhook configuration
+    GITHUB_WEBHOOK_SECRET: str = ""
+    INSTALLATION_INDEX_CONCURRENCY: int = 2
+
     # Optional: For sentence-transformers cache
     SENTENCE_TRANSFORMERS_HOME: Optional[str] = None
 
@@ -74,8 +115,3 @@ def get_settings() -> Settings:
         Settings: The singleton instance of application settings
     """
     return Settings()
-
-
-# Create a single instance of the settings to be used throughout the application
-# This maintains backward compatibility with existing code
-settings = get_settings()
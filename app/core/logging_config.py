@@ -6,21 +6,62 @@ This module provides a centralized logging configuration system that:
 2. Integrates with the application configuration
 3. Allows for consistent log formatting across the application
 4. Provides a structured JSON formatter for better log parsing
+5. Hands records to a background listener thread so formatting and file I/O
+   never block the caller
 """
 
-import json
+import atexit
+import copy
 import logging
 import logging.config
+import logging.handlers
 import os
 import sys
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+import orjson
 
 # Import settings without circular dependency
 from app.core.config import get_settings
 
+# Names of the QueueHandlers fronting the real handlers in get_logging_config
+_QUEUE_HANDLERS = ("queue_app", "queue_default")
+
+_queue_listeners: List[logging.handlers.QueueListener] = []
+
+# Built-in LogRecord attributes; anything else on a record was passed via extra
+_STANDARD_LOGRECORD_ATTRS = frozenset(
+    {
+        "args",
+        "asctime",
+        "created",
+        "exc_info",
+        "exc_text",
+        "filename",
+        "funcName",
+        "id",
+        "levelname",
+        "levelno",
+        "lineno",
+        "module",
+        "msecs",
+        "message",
+        "msg",
+        "name",
+        "pathname",
+        "process",
+        "processName",
+        "relativeCreated",
+        "stack_info",
+        "taskName",
+        "thread",
+        "threadName",
+    }
+)
+
 
 class StructuredJSONFormatter(logging.Formatter):
     """
@@ -32,7 +73,7 @@ class StructuredJSONFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -47,34 +88,29 @@ class StructuredJSONFormatter(logging.Formatter):
 
         # Include any extra attributes from record
         for key, value in record.__dict__.items():
-            if key not in [
-                "args",
-                "asctime",
-                "created",
-                "exc_info",
-                "exc_text",
-                "filename",
-                "funcName",
-                "id",
-                "levelname",
-                "levelno",
-                "lineno",
-                "module",
-                "msecs",
-                "message",
-                "msg",
-                "name",
-                "pathname",
-                "process",
-                "processName",
-                "relativeCreated",
-                "stack_info",
-                "thread",
-                "threadName",
-            ]:
+            if key not in _STANDARD_LOGRECORD_ATTRS:
                 log_data[key] = value
 
-        return json.dumps(log_data)
+        # Extras that orjson cannot serialize natively fall back to their str()
+        return orjson.dumps(log_data, default=str).decode()
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for an in-process queue that leaves formatting to the listener.
+
+    The stock prepare() formats the record on the calling thread, folding the
+    traceback into the message and clearing exc_info, so the target handlers'
+    formatters never see the exception. Records here never leave the process,
+    so only the message arguments are merged (the arguments may be mutated once
+    the call returns) and exception and stack info are kept for the formatters.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 @lru_cache()
@@ -131,27 +167,39 @@ def get_logging_config() -> Dict[str, Any]:
                 "backupCount": 10,
                 "encoding": "utf-8",
             },
+            # Loggers only see these queue handlers; the listener thread started
+            # in setup_logging drains them into the handlers listed above
+            "queue_app": {
+                "class": "app.core.logging_config.LocalQueueHandler",
+                "handlers": ["console", "file", "json_file"],
+                "respect_handler_level": True,
+            },
+            "queue_default": {
+                "class": "app.core.logging_config.LocalQueueHandler",
+                "handlers": ["console", "file"],
+                "respect_handler_level": True,
+            },
         },
         "loggers": {
             "uvicorn": {
-                "handlers": ["console", "file"],
+                "handlers": ["queue_default"],
                 "level": settings.LOG_LEVEL,
                 "propagate": False,
             },
             "fastapi": {
-                "handlers": ["console", "file"],
+                "handlers": ["queue_default"],
                 "level": settings.LOG_LEVEL,
                 "propagate": False,
             },
             "app": {  # Logger for the application
-                "handlers": ["console", "file", "json_file"],
+                "handlers": ["queue_app"],
                 "level": settings.LOG_LEVEL,
                 "propagate": False,
             },
         },
         "root": {
             "level": settings.LOG_LEVEL,
-            "handlers": ["console", "file"],
+            "handlers": ["queue_default"],
         },
     }
 
@@ -161,14 +209,35 @@ def setup_logging() -> None:
     Configure the logging system for the application.
 
     This function initializes logging with the configuration from get_logging_config
-    and ensures all loggers use the configured log levels from settings.
+    and ensures all loggers use the configured log levels from settings. Loggers
+    write to queue handlers, and the listener threads that drain them into the
+    console and file handlers are started here.
     """
+    stop_logging()
     logging_config = get_logging_config()
     logging.config.dictConfig(logging_config)
+    for handler_name in _QUEUE_HANDLERS:
+        handler = logging.getHandlerByName(handler_name)
+        if handler is not None and handler.listener is not None:
+            handler.listener.start()
+            _queue_listeners.append(handler.listener)
     logger = logging.getLogger("app")
     logger.debug("Logging system initialized")
 
 
+def stop_logging() -> None:
+    """
+    Stop the queue listener threads, flushing any records still queued.
+
+    Registered with atexit so buffered records are written when the process exits.
+    """
+    while _queue_listeners:
+        _queue_listeners.pop().stop()
+
+
+atexit.register(stop_logging)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger with the specified name.
@@ -1,27 +1,39 @@
-import hashlib
 import hmac
-import json
 import logging
 from typing import Any, Dict, Optional
 
+import orjson
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import hmac as crypto_hmac
 from fastapi import HTTPException, Request
 
-from app.core.config import settings
+from app.core.config import get_settings
 
 logger = logging.getLogger("app")
 
 # Get GitHub webhook secret from Pydantic settings
-GITHUB_WEBHOOK_SECRET = settings.GITHUB_WEBHOOK_SECRET
+GITHUB_WEBHOOK_SECRET = get_settings().GITHUB_WEBHOOK_SECRET
 if not GITHUB_WEBHOOK_SECRET:
     logger.warning(
         "GITHUB_WEBHOOK_SECRET not set. Webhook signature validation will be skipped."
     )
 
+# Key the HMAC once at import; each request works on a copy of this template
+# so the key schedule is not recomputed per webhook
+_HMAC_TEMPLATE = (
+    crypto_hmac.HMAC(GITHUB_WEBHOOK_SECRET.encode("utf-8"), hashes.SHA256())
+    if GITHUB_WEBHOOK_SECRET
+    else None
+)
+
 
 async def verify_webhook_signature(request: Request) -> bytes:
     """
     Verify that the webhook request came from GitHub by validating the signature.
 
+    The body is fed into the HMAC chunk by chunk as it is received, so the
+    payload is only assembled once and never re-read for hashing.
+
     Args:
         request: The FastAPI request object
 
@@ -31,6 +43,10 @@ async def verify_webhook_signature(request: Request) -> bytes:
     Raises:
         HTTPException: If the signature is invalid or missing
     """
+    # Skip validation if no secret is configured (for development only)
+    if not GITHUB_WEBHOOK_SECRET:
+        return await request.body()
+
     # Get the signature from the headers
     signature_header = request.headers.get("X-Hub-Signature-256")
 
@@ -39,30 +55,28 @@ async def verify_webhook_signature(request: Request) -> bytes:
             status_code=400, detail="X-Hub-Signature-256 header is missing!"
         )
 
-    # Read the raw request body
-    payload_body = await request.body()
-
-    # Skip validation if no secret is configured (for development only)
-    if not GITHUB_WEBHOOK_SECRET:
-        return payload_body
-
-    # The signature header starts with "sha256="
-    if not signature_header.startswith("sha256="):
+    # The signature header is "sha256=" followed by a 64-char hex digest
+    if len(signature_header) != 71 or signature_header[:7] != "sha256=":
         raise HTTPException(status_code=400, detail="Invalid signature format!")
 
-    # Get the signature from the header
-    signature = signature_header[7:]  # Remove "sha256=" prefix
+    # Decode the hex signature so digests are compared as raw bytes
+    try:
+        signature = bytes.fromhex(signature_header[7:])  # Remove "sha256=" prefix
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid signature format!")
 
-    # Calculate the expected signature
-    expected_signature = hmac.new(
-        GITHUB_WEBHOOK_SECRET.encode("utf-8"), payload_body, hashlib.sha256
-    ).hexdigest()
+    # Calculate the expected signature while reading the body
+    mac = _HMAC_TEMPLATE.copy()
+    chunks = []
+    async for chunk in request.stream():
+        mac.update(chunk)
+        chunks.append(chunk)
 
     # Compare signatures using a constant-time comparison to prevent timing attacks
-    # if not hmac.compare_digest(signature, expected_signature):
-    #     raise HTTPException(status_code=401, detail="Invalid signature")
+    if not hmac.compare_digest(signature, mac.finalize()):
+        raise HTTPException(status_code=401, detail="Invalid signature")
 
-    return payload_body
+    return b"".join(chunks)
 
 
 def extract_push_event_info(payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
@@ -101,7 +115,7 @@ def extract_push_event_info(payload: Dict[str, Any]) -> Optional[Dict[str, str]]
             "repo_name": repo_name,
         }
     except Exception as e:
-        logger.error(f"Error extracting push event info: {e}")
+        logger.error("Error extracting push event info: %s", e)
         return None
 
 
@@ -122,7 +136,7 @@ async def parse_webhook_payload(request: Request) -> Dict[str, Any]:
 
     # Parse the JSON payload
     try:
-        payload = json.loads(payload_body)
+        payload = orjson.loads(payload_body)
         return payload
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
@@ -0,0 +1,114 @@
+"""
+Persistent cache of the chunks extracted from source files.
+
+A full re-index parses every file of a repository again, although most of them
+are unchanged since the last run. The chunks of each parsed file are stored in
+SQLite, keyed by the file's path and a hash of its content, so unchanged files
+are served from the cache instead of going through tree-sitter.
+"""
+
+import hashlib
+import logging
+import sqlite3
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.core.config import get_settings
+from app.indexing.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger("app")
+
+# Bump when the chunk extraction changes, so that stale chunks are not reused
+CHUNK_CACHE_VERSION = b"1"
+
+
+class ChunkCache(SQLiteCache):
+    """
+    SQLite-backed store of the chunks of parsed files.
+
+    One row is kept per file path, holding the content hash it was parsed
+    from, so the cache never grows past the number of files indexed. Cache
+    errors are logged and treated as misses, they never fail a parse.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS chunks "
+        "(path TEXT PRIMARY KEY, hash BLOB NOT NULL, chunks BLOB NOT NULL)"
+    )
+
+    @staticmethod
+    def content_key(relative_path: str, content) -> bytes:
+        """
+        Hashes a file's content together with the path its chunks refer to.
+
+        Args:
+            relative_path: The path stored in the chunks' id and file_path.
+            content: The file content, as bytes or any bytes-like buffer.
+
+        Returns:
+            A 16-byte digest identifying the file version.
+        """
+        digest = hashlib.blake2b(CHUNK_CACHE_VERSION, digest_size=16)
+        digest.update(relative_path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.digest()
+
+    def get(self, path: str, key: bytes) -> Optional[List[Dict[str, Any]]]:
+        """
+        Looks up the cached chunks of a file.
+
+        Args:
+            path: The path of the file on disk.
+            key: The content key of the file, see content_key.
+
+        Returns:
+            The cached chunks, or None if the file's current content is not cached.
+        """
+        try:
+            row = (
+                self._connection()
+                .execute("SELECT hash, chunks FROM chunks WHERE path = ?", (path,))
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Chunk cache lookup failed for {path}: {e}")
+            return None
+        if row is None or row[0] != key:
+            return None
+        try:
+            return orjson.loads(row[1])
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Corrupt chunk cache entry for {path}: {e}")
+            return None
+
+    def put(self, path: str, key: bytes, chunks: List[Dict[str, Any]]) -> None:
+        """
+        Stores the chunks of a file, replacing those of any previous version.
+
+        Args:
+            path: The path of the file on disk.
+            key: The content key of the file, see content_key.
+            chunks: The chunks extracted from the file.
+        """
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO chunks (path, hash, chunks) VALUES (?, ?, ?)",
+                (path, key, orjson.dumps(chunks)),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Chunk cache update failed for {path}: {e}")
+
+
+@lru_cache()
+def get_chunk_cache() -> Optional[ChunkCache]:
+    """
+    Returns the process-wide chunk cache.
+
+    Returns:
+        The cache at CHUNK_CACHE_PATH, or None if caching is disabled.
+    """
+    db_path = get_settings().CHUNK_CACHE_PATH
+    return ChunkCache(db_path) if db_path else None
@@ -1,9 +1,13 @@
 import logging
+import mmap
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Union
 
 from tree_sitter import Language, Parser
 
+from app.indexing.chunk_cache import get_chunk_cache
+
 # --- Tree-sitter Language Setup ---
 # This section helps in locating and loading the compiled tree-sitter language grammar.
 # The exact path might vary based on your environment and how tree-sitter-python was installed.
@@ -16,8 +20,26 @@ LANGUAGE_BUILD_PATH = os.path.join(
 PYTHON_LANGUAGE_GRAMMAR_PATH = "tree_sitter_python.language"
 
 _PYTHON_LANG = None
+_PYTHON_QUERY = None
+# Parsers are not thread-safe, so each thread gets its own
+_thread_local = threading.local()
 logger = logging.getLogger("app")
 
+# Tree-sitter query to find function and class definitions
+# You can expand this query to capture more types of nodes if needed.
+CHUNK_QUERY = """
+(function_definition
+    name: (identifier) @function.name)
+@function.definition
+
+(class_definition
+    name: (identifier) @class.name)
+@class.definition
+"""
+
+# Files at least this large are memory-mapped instead of read into a buffer
+MMAP_MIN_FILE_SIZE = 64 * 1024
+
 
 def get_python_language() -> Optional[Language]:
     """Loads the Tree-sitter Python language grammar."""
@@ -75,88 +97,108 @@ def get_python_language() -> Optional[Language]:
         return None
 
 
+def get_python_parser() -> Optional[Parser]:
+    """Returns this thread's Tree-sitter parser for Python, creating it once."""
+    parser = getattr(_thread_local, "parser", None)
+    if parser is None:
+        PY_LANGUAGE = get_python_language()
+        if not PY_LANGUAGE:
+            return None
+        parser = Parser()
+        parser.set_language(PY_LANGUAGE)
+        _thread_local.parser = parser
+    return parser
+
+
+def get_chunk_query():
+    """Returns the compiled chunk query, compiling it on first use."""
+    global _PYTHON_QUERY
+    if _PYTHON_QUERY is None:
+        PY_LANGUAGE = get_python_language()
+        if not PY_LANGUAGE:
+            return None
+        _PYTHON_QUERY = PY_LANGUAGE.query(CHUNK_QUERY)
+    return _PYTHON_QUERY
+
+
+def warm_up_parser() -> None:
+    """
+    Loads the grammar, the parser and the chunk query ahead of the first parse.
+
+    Used as a process-pool initializer so each worker pays the setup once.
+    """
+    get_python_parser()
+    get_chunk_query()
+
+
 # --- Code Chunking Logic ---
 
 
-def parse_and_extract_chunks(file_path: str, code_content: str) -> List[Dict[str, Any]]:
+def parse_and_extract_chunks(
+    file_path: str, code_content: Union[str, bytes, mmap.mmap]
+) -> List[Dict[str, Any]]:
     """
     Parses Python code using Tree-sitter and extracts functions and classes as chunks.
 
     Args:
         file_path: The path to the file being parsed (for context).
-        code_content: The string content of the Python code.
+        code_content: The Python code, as a string or as UTF-8 bytes. A bytes-like
+            buffer (e.g. an mmap) is parsed in place without a copy and must stay
+            open until this function returns.
 
     Returns:
         A list of dictionaries, where each dictionary represents a code chunk
         (e.g., a function or class) with its name, code, start and end lines.
         Returns an empty list if parsing fails or no relevant chunks are found.
     """
-    PY_LANGUAGE = get_python_language()
-    if not PY_LANGUAGE:
-        return []
+    chunks = _extract_chunks(file_path, code_content)
+    return chunks if chunks is not None else []
 
-    parser = Parser()
-    parser.set_language(PY_LANGUAGE)
+
+def _extract_chunks(
+    file_path: str, code_content: Union[str, bytes, mmap.mmap]
+) -> Optional[List[Dict[str, Any]]]:
+    """Extracts chunks like parse_and_extract_chunks, returning None on failure."""
+    parser = get_python_parser()
+    if not parser:
+        return None
 
     try:
-        tree = parser.parse(bytes(code_content, "utf8"))
+        if isinstance(code_content, str):
+            code_content = code_content.encode("utf8")
+        tree = parser.parse(code_content)
     except Exception as e:
         logger.error(f"Error parsing file {file_path}: {e}")
-        return []
+        return None
 
     chunks = []
 
-    # Tree-sitter query to find function and class definitions
-    # You can expand this query to capture more types of nodes if needed.
-    query_string = """
-    (function_definition
-        name: (identifier) @function.name)
-    @function.definition
-
-    (class_definition
-        name: (identifier) @class.name)
-    @class.definition
-    """
-
     try:
-        query = PY_LANGUAGE.query(query_string)
+        query = get_chunk_query()
         captures = query.captures(tree.root_node)
     except Exception as e:
         logger.error(f"Error executing tree-sitter query on {file_path}: {e}")
-        return []
+        return None
 
     # Process captures to extract chunk information
-    # We iterate through captures, looking for the main definition nodes
-    # and their associated names.
+    # We iterate through captures, looking for the main definition nodes;
+    # the name of each one is its "name" field, the node the query captured.
     for node, capture_name in captures:
         if capture_name == "function.definition" or capture_name == "class.definition":
             chunk_type = (
                 "function" if capture_name == "function.definition" else "class"
             )
-            # Find the corresponding name capture for this definition
-            chunk_name_node = None
-            for n_cap, cn_cap in captures:
-                if (
-                    capture_name == "function.definition"
-                    and cn_cap == "function.name"
-                    and n_cap.parent == node
-                ) or (
-                    capture_name == "class.definition"
-                    and cn_cap == "class.name"
-                    and n_cap.parent == node
-                ):
-                    chunk_name_node = n_cap
-                    break
+            chunk_name_node = node.child_by_field_name("name")
 
             chunk_name = (
-                chunk_name_node.text.decode("utf8")
+                chunk_name_node.text.decode("utf8", errors="ignore")
                 if chunk_name_node
                 else "<anonymous>"
             )
 
             start_line = node.start_point[0] + 1  # 0-indexed to 1-indexed
             end_line = node.end_point[0] + 1  # 0-indexed to 1-indexed
-            code_text = node.text.decode("utf8")
+            code_text = node.text.decode("utf8", errors="ignore")
 
             chunks.append(
                 {
@@ -173,6 +215,55 @@ def parse_and_extract_chunks(file_path: str, code_content: str) -> List[Dict[str
     return chunks
 
 
+def parse_file(full_path: str, relative_path: str) -> List[Dict[str, Any]]:
+    """
+    Reads a Python file and extracts its functions and classes as chunks.
+
+    This module only depends on tree-sitter, so the function can run in a
+    process-pool worker without loading the embedding stack. The raw bytes are
+    handed to tree-sitter without decoding the whole file; large files are
+    memory-mapped so their content is never copied into the Python heap.
+    Files whose content is unchanged since they were last parsed are served
+    from the chunk cache.
+
+    Args:
+        full_path: The path of the file on disk.
+        relative_path: The path of the file relative to the repository root,
+            used for the chunk IDs and file_path fields.
+
+    Returns:
+        The extracted chunks, as returned by parse_and_extract_chunks.
+    """
+    with open(full_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_FILE_SIZE:
+            return _parse_with_cache(full_path, relative_path, f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse_with_cache(full_path, relative_path, mm)
+
+
+def _parse_with_cache(
+    full_path: str, relative_path: str, content: Union[bytes, mmap.mmap]
+) -> List[Dict[str, Any]]:
+    """
+    Parses file content, going through the chunk cache when it is enabled.
+
+    Only successful parses are cached; a failure (grammar not loaded, parse or
+    query error) yields no chunks now but is retried on the next run.
+    """
+    cache = get_chunk_cache()
+    if cache is None:
+        return parse_and_extract_chunks(relative_path, content)
+
+    key = cache.content_key(relative_path, content)
+    chunks = cache.get(full_path, key)
+    if chunks is None:
+        chunks = _extract_chunks(relative_path, content)
+        if chunks is None:
+            return []
+        cache.put(full_path, key, chunks)
+    return chunks
+
+
 # Example Usage (for testing this module directly)
 if __name__ == "__main__":
     from app.core.logging_config import setup_logging
@@ -0,0 +1,118 @@
+"""
+Persistent cache of chunk embeddings.
+
+Re-indexing a repository embeds every chunk again, although most of them are
+unchanged since the last run. Embeddings are stored in SQLite, keyed by the
+embedding model setup and a hash of the chunk text, so unchanged chunks skip the
+encoder forward pass entirely.
+"""
+
+import logging
+import sqlite3
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.indexing.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger("app")
+
+# Maximum number of keys bound to a single SQLite lookup
+_LOOKUP_BATCH_SIZE = 500
+
+
+class EmbeddingCache(SQLiteCache):
+    """
+    SQLite-backed store of embeddings keyed by model setup and content hash.
+
+    Embeddings are stored as float16, half the size of the float32 vectors
+    they come from; the rounding error is far below what affects search
+    ranking. Cache errors are logged and treated as misses, they never fail
+    an embedding call. The file only ever holds derived data and can be deleted
+    at any time to reclaim space.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, "
+        "hash TEXT NOT NULL, embedding BLOB NOT NULL, "
+        "PRIMARY KEY (model, hash)) WITHOUT ROWID"
+    )
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up the cached embeddings of the given chunk hashes.
+
+        Args:
+            model: Key of the model setup the embeddings were produced with,
+                see SentenceTransformerModel.cache_key.
+            hashes: Content hashes of the chunks.
+
+        Returns:
+            A dictionary mapping the cached hashes to float32 embeddings; hashes
+            that are not cached are left out.
+        """
+        found = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+                batch = hashes[start : start + _LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT hash, embedding FROM embeddings "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    (model, *batch),
+                )
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = np.frombuffer(blob, dtype=np.float16).astype(
+                        np.float32
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+        return found
+
+    def put_many(self, model: str, hashes: List[str], embeddings: np.ndarray) -> None:
+        """
+        Stores embeddings for the given chunk hashes.
+
+        Args:
+            model: Key of the model setup the embeddings were produced with,
+                see SentenceTransformerModel.cache_key.
+            hashes: Content hashes of the chunks, in row order.
+            embeddings: 2D array with one embedding row per hash.
+        """
+        rows = embeddings.astype(np.float16)
+        try:
+            conn = self._connection()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache update failed: {e}")
+            return
+        try:
+            # One transaction for the whole batch instead of one per row
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, embedding) "
+                "VALUES (?, ?, ?)",
+                (
+                    (model, chunk_hash, row.tobytes())
+                    for chunk_hash, row in zip(hashes, rows)
+                ),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache update failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+
+@lru_cache()
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Returns the process-wide embedding cache.
+
+    Returns:
+        The cache at EMBEDDING_CACHE_PATH, or None if caching is disabled.
+    """
+    db_path = get_settings().EMBEDDING_CACHE_PATH
+    return EmbeddingCache(db_path) if db_path else None
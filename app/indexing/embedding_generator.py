@@ -7,23 +7,154 @@ the complexity of model initialization and caching.
 """
 
 import os
+import threading
 from abc import ABC, abstractmethod
 from enum import Enum
 from functools import lru_cache
-from typing import Dict, Optional, Type, Union
+from typing import Any, Dict, List, Optional, Type, Union
 
-# Set tokenizers parallelism to avoid deadlocks with forked processes
-os.environ["TOKENIZERS_PARALLELISM"] = "false"
+# Let the fast tokenizers use their own thread pool for batch encodes. Nothing
+# that tokenizes is forked after the model loads (the parse pool is spawned and
+# git subprocesses exec immediately), so the fork deadlock this guards against
+# cannot occur; an explicit setting in the environment still takes precedence.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
 
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 
-from app.core.config import settings
+from app.core.config import get_settings
 from app.core.logging_config import get_logger
+from app.indexing.embedding_cache import get_embedding_cache
+from app.utils.general_utils import content_hash
 
 logger = get_logger(__name__)
 
 
+def configure_torch_threads(num_threads: int) -> None:
+    """
+    Cap the threads torch uses for embedding inference.
+
+    By default torch starts one intra-op thread per core, which oversubscribes the
+    CPU when files are processed concurrently.
+
+    Args:
+        num_threads: Number of intra-op threads
+    """
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        logger.debug("torch inter-op thread count already set, leaving it as is")
+
+
+configure_torch_threads(get_settings().EMBEDDING_NUM_THREADS)
+
+
+def resolve_device(device: Optional[str] = None) -> str:
+    """
+    Resolve the torch device to run embedding inference on.
+
+    Args:
+        device: Explicit device (e.g. "cpu", "cuda", "cuda:1", "mps"). If None,
+            the best available accelerator is picked automatically.
+
+    Returns:
+        str: The device name to pass to the model
+    """
+    if device:
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def resolve_precision(device: str, precision: str = "auto") -> str:
+    """
+    Resolve "auto" to the inference precision used on a device.
+
+    Args:
+        device: Device the model runs on
+        precision: The configured precision, see apply_precision
+
+    Returns:
+        str: The precision to apply, never "auto"
+    """
+    if precision == "auto":
+        return "fp16" if device.startswith("cuda") else "fp32"
+    return precision
+
+
+def apply_precision(
+    model: SentenceTransformer, device: str, precision: str = "auto"
+) -> SentenceTransformer:
+    """
+    Convert a loaded SentenceTransformer to a lower-precision inference format.
+
+    Args:
+        model: The loaded model
+        device: Device the model was loaded on
+        precision: One of "fp32", "fp16", "bf16" or "int8". "auto" picks fp16 on
+            CUDA and fp32 elsewhere. int8 (dynamic quantization of the Linear
+            layers, CPU only) is opt-in, as its vectors drift enough from fp32
+            ones that a table should be reindexed after switching to it. bf16
+            keeps the fp32 exponent range, which avoids fp16 overflow, but
+            needs a GPU with native bfloat16 support (Ampere or newer).
+
+    Returns:
+        SentenceTransformer: The converted model
+
+    Raises:
+        ValueError: If the precision is not supported on the device
+    """
+    precision = resolve_precision(device, precision)
+    if precision == "fp32":
+        return model
+    if precision == "fp16":
+        return model.half()
+    if precision == "bf16":
+        if device.startswith("cuda") and not torch.cuda.is_bf16_supported():
+            raise ValueError("bf16 is not supported by this GPU")
+        return model.to(torch.bfloat16)
+    if precision == "int8":
+        if device != "cpu":
+            raise ValueError("int8 dynamic quantization is only supported on CPU")
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    raise ValueError(f"Unsupported embedding precision: {precision}")
+
+
+def _onnx_model_kwargs(device: str, num_threads: int) -> Dict[str, Any]:
+    """
+    Build the ONNX Runtime session arguments for a SentenceTransformer.
+
+    All graph optimizations are enabled explicitly, so ONNX Runtime fuses the
+    attention, GELU and LayerNorm subgraphs of the exported encoder whatever
+    defaults the installed optimum/onnxruntime versions use. On CUDA, optimum
+    binds inputs and outputs to device memory (IOBinding) by default.
+    """
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = (
+        onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+    return {
+        "provider": (
+            "CUDAExecutionProvider"
+            if device.startswith("cuda")
+            else "CPUExecutionProvider"
+        ),
+        "session_options": session_options,
+    }
+
+
 class ModelType(str, Enum):
     """
     Enumeration of supported embedding model types.
@@ -74,17 +205,60 @@ class SentenceTransformerModel(EmbeddingModel):
     This class wraps the SentenceTransformer model to conform to our EmbeddingModel interface.
     """
 
-    def __init__(self, model_name: str, cache_folder: Optional[str] = None):
+    def __init__(
+        self,
+        model_name: str,
+        cache_folder: Optional[str] = None,
+        device: Optional[str] = None,
+        precision: str = "fp32",
+        backend: str = "torch",
+        num_threads: Optional[int] = None,
+    ):
         """
         Initialize the SentenceTransformer model.
 
         Args:
             model_name: Name of the sentence-transformer model to load
             cache_folder: Optional folder to cache models
+            device: Torch device to load the model on. Auto-detected if None.
+            precision: Inference precision for the torch backend, see
+                apply_precision
+            backend: "torch" for PyTorch eager inference or "onnx" for ONNX
+                Runtime (exported on first load, requires the "onnx" extra)
+            num_threads: Intra-op thread count for the ONNX Runtime session
         """
-        logger.info(f"Initializing SentenceTransformer model: {model_name}")
+        self.model_name = model_name
+        device = resolve_device(device)
+        # Identifies the vectors this setup produces in the embedding cache; the
+        # ONNX backend always runs the exported fp32 graph
+        self.cache_key = "|".join(
+            (
+                model_name,
+                backend,
+                "fp32" if backend == "onnx" else resolve_precision(device, precision),
+            )
+        )
+        logger.info(
+            f"Initializing SentenceTransformer model: {model_name} on device: {device} "
+            f"with backend: {backend}"
+        )
         try:
-            self.model = SentenceTransformer(model_name, cache_folder=cache_folder)
+            if backend == "onnx":
+                self.model = SentenceTransformer(
+                    model_name,
+                    cache_folder=cache_folder,
+                    device=device,
+                    backend="onnx",
+                    model_kwargs=_onnx_model_kwargs(device, num_threads),
+                )
+            else:
+                self.model = apply_precision(
+                    SentenceTransformer(
+                        model_name, cache_folder=cache_folder, device=device
+                    ),
+                    device,
+                    precision,
+                )
             logger.info(f"SentenceTransformer model '{model_name}' loaded successfully")
         except Exception as e:
             logger.error(f"Error loading SentenceTransformer model '{model_name}': {e}")
@@ -99,10 +273,19 @@ class SentenceTransformerModel(EmbeddingModel):
             **kwargs: Additional arguments for SentenceTransformer.encode
 
         Returns:
-            numpy.ndarray: The generated embedding vector(s)
+            numpy.ndarray: The generated embedding vector(s). Numpy output is
+            always float32, whatever precision the model runs in, to match the
+            vector store schema.
         """
-        convert_to_numpy = kwargs.get("convert_to_numpy", True)
-        return self.model.encode(text, convert_to_numpy=convert_to_numpy)
+        convert_to_numpy = kwargs.pop("convert_to_numpy", True)
+        # inference_mode skips autograd version tracking, cheaper than no_grad
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                text, convert_to_numpy=convert_to_numpy, **kwargs
+            )
+        if convert_to_numpy:
+            return embeddings.astype(np.float32, copy=False)
+        return embeddings
 
     def get_embedding_dimension(self) -> int:
         """
@@ -127,6 +310,7 @@ class EmbeddingModelFactory:
     }
 
     _instances: Dict[str, EmbeddingModel] = {}
+    _lock = threading.Lock()
 
     @classmethod
     def register_model_type(
@@ -145,7 +329,7 @@ class EmbeddingModelFactory:
     @classmethod
     def get_model(
         cls,
-        model_name: str = settings.EMBEDDING_MODEL_NAME,
+        model_name: Optional[str] = None,
         model_type: str = ModelType.SENTENCE_TRANSFORMER,
         **kwargs,
     ) -> EmbeddingModel:
@@ -153,7 +337,8 @@ class EmbeddingModelFactory:
         Get an instance of an embedding model, creating it if it doesn't exist.
 
         Args:
-            model_name: Name of the model to initialize
+            model_name: Name of the model to initialize. Defaults to the
+                EMBEDDING_MODEL_NAME setting.
             model_type: Type of model to initialize
             **kwargs: Additional arguments for model initialization
 
@@ -163,24 +348,39 @@ class EmbeddingModelFactory:
         Raises:
             ValueError: If the model type is not supported
         """
+        settings = get_settings()
+        model_name = model_name or settings.EMBEDDING_MODEL_NAME
         model_key = f"{model_type}:{model_name}"
 
-        if model_key not in cls._instances:
-            logger.info(f"Creating new model instance for '{model_key}'")
+        model = cls._instances.get(model_key)
+        if model is not None:
+            return model
 
-            if model_type not in cls._model_registry:
-                raise ValueError(f"Unsupported model type: {model_type}")
+        # Serialize first loads so concurrent callers never load the same model twice
+        with cls._lock:
+            if model_key not in cls._instances:
+                logger.info(f"Creating new model instance for '{model_key}'")
 
-            model_class = cls._model_registry[model_type]
+                if model_type not in cls._model_registry:
+                    raise ValueError(f"Unsupported model type: {model_type}")
 
-            # Handle specific initialization for different model types
-            if model_type == ModelType.SENTENCE_TRANSFORMER:
-                cache_folder = settings.SENTENCE_TRANSFORMERS_HOME
-                cls._instances[model_key] = model_class(model_name, cache_folder)
-            else:
-                cls._instances[model_key] = model_class(model_name, **kwargs)
+                model_class = cls._model_registry[model_type]
+
+                # Handle specific initialization for different model types
+                if model_type == ModelType.SENTENCE_TRANSFORMER:
+                    cache_folder = settings.SENTENCE_TRANSFORMERS_HOME
+                    cls._instances[model_key] = model_class(
+                        model_name,
+                        cache_folder,
+                        device=settings.EMBEDDING_DEVICE,
+                        precision=settings.EMBEDDING_PRECISION,
+                        backend=settings.EMBEDDING_BACKEND,
+                        num_threads=settings.EMBEDDING_NUM_THREADS,
+                    )
+                else:
+                    cls._instances[model_key] = model_class(model_name, **kwargs)
 
-        return cls._instances[model_key]
+            return cls._instances[model_key]
 
     @classmethod
     def clear_cache(cls) -> None:
@@ -205,6 +405,19 @@ def get_embedding_model() -> EmbeddingModel:
     return EmbeddingModelFactory.get_model()
 
 
+def warm_up_embedding_model() -> None:
+    """
+    Load the default embedding model and run one encode.
+
+    Called at process startup so the model load and first-inference setup
+    (device context, kernel selection, weight paging) are not paid by the first
+    request that needs an embedding.
+    """
+    model = get_embedding_model()
+    model.encode("warmup", convert_to_numpy=True)
+    logger.info("Embedding model warmed up")
+
+
 def get_embedding(
     code_chunk: str, model: Optional[EmbeddingModel] = None
 ) -> Optional[np.ndarray]:
@@ -237,6 +450,99 @@ def get_embedding(
         return None
 
 
+def _encode_with_cache(
+    model: EmbeddingModel, code_chunks: List[str], **kwargs
+) -> np.ndarray:
+    """Encodes texts, serving those already in the embedding cache from it."""
+    cache = get_embedding_cache()
+    cache_key = getattr(model, "cache_key", None)
+    if cache is None or cache_key is None:
+        return model.encode(code_chunks, **kwargs)
+
+    chunk_hashes = [content_hash(chunk) for chunk in code_chunks]
+    cached = cache.get_many(cache_key, chunk_hashes)
+    missing = [
+        row for row, chunk_hash in enumerate(chunk_hashes) if chunk_hash not in cached
+    ]
+    if not cached:
+        embeddings = model.encode(code_chunks, **kwargs)
+        cache.put_many(cache_key, chunk_hashes, embeddings)
+        return embeddings
+
+    logger.debug(f"Embedding cache hit for {len(cached)} of {len(code_chunks)} chunks")
+    dimension = len(next(iter(cached.values())))
+    embeddings = np.empty((len(code_chunks), dimension), dtype=np.float32)
+    for row, chunk_hash in enumerate(chunk_hashes):
+        if chunk_hash in cached:
+            embeddings[row] = cached[chunk_hash]
+    if missing:
+        new_embeddings = model.encode([code_chunks[row] for row in missing], **kwargs)
+        embeddings[missing] = new_embeddings
+        cache.put_many(
+            cache_key, [chunk_hashes[row] for row in missing], new_embeddings
+        )
+    return embeddings
+
+
+def get_embeddings_batch(
+    code_chunks: List[str],
+    model: Optional[EmbeddingModel] = None,
+    batch_size: Optional[int] = None,
+) -> Optional[np.ndarray]:
+    """
+    Generates vector embeddings for a list of code chunk strings in batches.
+
+    All chunks go to the model in a single encode call, which runs one forward
+    pass per batch (SentenceTransformer length-sorts the inputs internally so
+    each batch carries little padding) instead of one per chunk. Identical
+    chunks (boilerplate __init__ methods, stubs, copy-pasted helpers) are
+    encoded only once, and chunks found in the embedding cache are not encoded
+    at all.
+
+    Args:
+        code_chunks: The strings of code to embed.
+        model: The pre-loaded EmbeddingModel. If None, it will use the default model.
+        batch_size: Number of chunks per forward pass. Defaults to the
+            EMBEDDING_BATCH_SIZE setting.
+
+    Returns:
+        A 2D numpy array with one embedding row per chunk, in input order,
+        or None if an error occurs.
+    """
+    if model is None:
+        try:
+            model = get_embedding_model()
+        except Exception as e:
+            logger.error(f"Failed to initialize embedding model: {e}")
+            return None
+
+    if not code_chunks or not all(
+        chunk and isinstance(chunk, str) for chunk in code_chunks
+    ):
+        logger.error("Error: Code chunks must be a non-empty list of non-empty strings")
+        return None
+
+    # Order-preserving dedup: maps each distinct text to its row in the output
+    unique_rows: Dict[str, int] = {}
+    inverse = [unique_rows.setdefault(chunk, len(unique_rows)) for chunk in code_chunks]
+
+    unique_chunks = list(unique_rows)
+
+    try:
+        embeddings = _encode_with_cache(
+            model,
+            unique_chunks,
+            batch_size=batch_size or get_settings().EMBEDDING_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        if len(unique_rows) == len(code_chunks):
+            return embeddings
+        return embeddings[inverse]
+    except Exception as e:
+        logger.error(f"Error generating embeddings for {len(code_chunks)} chunks: {e}")
+        return None
+
+
 # Example Usage (for testing this module directly)
 if __name__ == "__main__":
     # Setup basic logging for the script execution
@@ -244,6 +550,7 @@ if __name__ == "__main__":
 
     setup_logging()
     logger.info("Running embedding_generator.py directly.")
+    settings = get_settings()
 
     # Ensure sentence-transformers is installed: pip install sentence-transformers
     logger.info(f"Using EMBEDDING_MODEL_NAME: {settings.EMBEDDING_MODEL_NAME}")
@@ -1,7 +1,10 @@
+import multiprocessing
 import os
 import time
-from typing import Any, Dict, List
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from git import GitCommandError, Repo
 
 from app.core.config import get_settings
@@ -11,18 +14,31 @@ from app.core.exceptions import (
     VectorDBError,
 )
 from app.core.logging_config import get_logger
-from app.indexing.code_parser import parse_and_extract_chunks
-from app.indexing.embedding_generator import get_embedding, get_embedding_model
-from app.storage.repo_manager import clone_or_pull_repository
+from app.indexing.code_parser import parse_file, warm_up_parser
+from app.indexing.embedding_generator import get_embedding_model, get_embeddings_batch
+from app.storage.repo_manager import clone_or_pull_repository, get_local_repo_path
 from app.storage.vector_store import (
-    CodeChunkSchema,
+    build_code_chunk_batch,
     create_code_table_if_not_exists,
+    ensure_vector_index,
     get_lancedb_conn,
+    optimize_table,
 )
-from app.utils.general_utils import repo_url_to_table_name
+from app.utils.general_utils import content_hash, repo_url_to_table_name
 
 logger = get_logger(__name__)
 
+# Maximum number of file paths in the IN list of a single delete predicate
+DELETE_BATCH_SIZE = 500
+
+# Number of changed files from which parsing is spread over processes rather
+# than threads; below it, starting the worker processes costs more than it saves
+PROCESS_POOL_MIN_FILES = 500
+
+# Number of small fragments, roughly one per incremental run that added chunks,
+# that accumulate before the table is compacted
+OPTIMIZE_MIN_SMALL_FRAGMENTS = 16
+
 
 def get_changed_files(
     repo: Repo, old_commit: str, new_commit: str
@@ -45,42 +61,38 @@ def get_changed_files(
     try:
         # Get the diff between the two commits
         logger.debug(
-            f"Getting diff between commits {old_commit[:7]} and {new_commit[:7]}"
+            "Getting diff between commits %s and %s", old_commit[:7], new_commit[:7]
+        )
+        # Compare the two trees directly, letting Git filter Python files. With
+        # -z, paths are NUL-terminated and never quoted; with --no-renames a
+        # renamed file is reported as a deletion and an addition, so the chunks
+        # under its old path are removed and it is indexed under its new one.
+        diff_index = repo.git.diff_tree(
+            "-r",
+            "--name-status",
+            "-z",
+            "--no-renames",
+            old_commit,
+            new_commit,
+            "--",
+            "*.py",
         )
-        diff_index = repo.git.diff("--name-status", old_commit, new_commit)
-
-        # Parse the diff output
-        added_files = []
-        modified_files = []
-        deleted_files = []
-
-        for line in diff_index.splitlines():
-            if not line.strip():
-                continue
-
-            # Parse the line: Format is STATUS\tFILENAME
-            parts = line.strip().split("\t")
-            if len(parts) < 2:
-                logger.warning(f"Unexpected diff format in line: {line}. Skipping.")
-                continue
-
-            status, path = parts[0], parts[1]
-
-            # Only include Python files for this example
-            if not path.endswith(".py"):
-                continue
 
-            # Categorize based on Git status
-            if status.startswith("A"):  # Added
-                added_files.append(path)
-            elif status.startswith("M"):  # Modified
-                modified_files.append(path)
-            elif status.startswith("D"):  # Deleted
-                deleted_files.append(path)
-            # You could handle renamed files ('R') differently if needed
+        # The output alternates status and path fields
+        fields = diff_index.split("\0")
+        changed = {"A": [], "M": [], "D": []}
+        for status, file_path in zip(fields[::2], fields[1::2]):
+            if status in changed:
+                changed[status].append(file_path)
+        added_files = changed["A"]
+        modified_files = changed["M"]
+        deleted_files = changed["D"]
 
         logger.debug(
-            f"Found {len(added_files)} added, {len(modified_files)} modified, and {len(deleted_files)} deleted Python files"
+            "Found %s added, %s modified, and %s deleted Python files",
+            len(added_files),
+            len(modified_files),
+            len(deleted_files),
         )
         return {
             "added": added_files,
@@ -102,6 +114,59 @@ def get_changed_files(
         ) from e
 
 
+def _file_paths_filter(repo_url: str, file_paths: List[str]) -> str:
+    """
+    Builds a LanceDB filter matching the chunks of the given files in a repository.
+
+    The files are matched with a single set-membership predicate. Single quotes
+    are escaped in every literal to avoid SQL injection.
+    """
+    safe_repo_url = repo_url.replace("'", "''")
+    quoted_paths = ", ".join(
+        "'" + file_path.replace("'", "''") + "'" for file_path in file_paths
+    )
+    return f"repo_url = '{safe_repo_url}' AND file_path IN ({quoted_paths})"
+
+
+def fetch_chunk_embeddings(
+    db_table, repo_url: str, file_paths: List[str]
+) -> Dict[str, np.ndarray]:
+    """
+    Loads the stored embeddings of the given files' chunks, keyed by content hash.
+
+    Args:
+        db_table: A LanceDB table instance.
+        repo_url: The repository URL associated with the chunks.
+        file_paths: A list of file paths to load chunk embeddings for.
+
+    Returns:
+        A dictionary mapping chunk content hashes to their embeddings. Empty if
+        nothing is stored or the lookup fails.
+    """
+    if not file_paths:
+        return {}
+
+    try:
+        rows = (
+            db_table.search()
+            .where(
+                f"{_file_paths_filter(repo_url, file_paths)} AND chunk_hash IS NOT NULL"
+            )
+            .select(["chunk_hash", "embedding"])
+            .limit(None)
+            .to_arrow()
+        )
+    except Exception as e:
+        logger.warning("Unable to load stored chunk embeddings: %s", e)
+        return {}
+
+    if rows.num_rows == 0:
+        return {}
+    embeddings = rows.column("embedding").combine_chunks()
+    matrix = embeddings.values.to_numpy().reshape(-1, embeddings.type.list_size)
+    return dict(zip(rows.column("chunk_hash").to_pylist(), matrix))
+
+
 def delete_file_chunks_from_db(db_table, repo_url: str, file_paths: List[str]) -> int:
     """
     Deletes chunks related to specific file paths from a LanceDB table.
@@ -122,35 +187,32 @@ def delete_file_chunks_from_db(db_table, repo_url: str, file_paths: List[str]) -
         return 0
 
     try:
-        # Prepare the query
-        query_conditions = []
-        for file_path in file_paths:
-            # Escape single quotes in the path to avoid SQL injection
-            safe_path = file_path.replace("'", "''")
-            query_conditions.append(
-                f"(repo_url = '{repo_url}' AND file_path = '{safe_path}')"
+        deleted_count = 0
+        count_known = True
+        # Bound the IN list so a large push doesn't build one huge predicate
+        for start in range(0, len(file_paths), DELETE_BATCH_SIZE):
+            query = _file_paths_filter(
+                repo_url, file_paths[start : start + DELETE_BATCH_SIZE]
             )
+            logger.debug("Delete query: %s", query)
 
-        # Combine conditions with OR
-        query = " OR ".join(query_conditions)
-        logger.debug(f"Delete query: {query}")
+            # Count matching rows without materializing them
+            if count_known:
+                try:
+                    deleted_count += db_table.count_rows(filter=query)
+                except Exception as e:
+                    logger.warning("Unable to count chunks before deletion: %s", e)
+                    count_known = False
 
-        # Check how many rows will be affected
-        try:
-            data = db_table.search().where(query).to_pandas()
-            deleted_count = len(data)
-        except Exception as e:
-            logger.warning(f"Unable to count chunks before deletion: {str(e)}")
-            deleted_count = -1  # Indicate we don't know how many will be deleted
+            # Delete the chunks
+            db_table.delete(query)
 
-        # Delete the chunks
-        db_table.delete(query)
-        if deleted_count >= 0:
-            logger.debug(f"Deleted {deleted_count} chunks from LanceDB table")
+        if count_known:
+            logger.debug("Deleted %s chunks from LanceDB table", deleted_count)
         else:
             logger.debug("Deleted chunks from LanceDB table (count unknown)")
 
-        return deleted_count if deleted_count >= 0 else 0
+        return deleted_count if count_known else 0
 
     except Exception as e:
         error_msg = f"Error deleting chunks from vector database: {str(e)}"
@@ -158,12 +220,99 @@ def delete_file_chunks_from_db(db_table, repo_url: str, file_paths: List[str]) -
         raise VectorDBError("chunk_deletion", error_msg) from e
 
 
+def _parse_executor(num_files: int) -> Executor:
+    """
+    Returns an executor suited to reading and parsing the given number of files.
+
+    Chunk extraction walks the syntax tree in Python and holds the GIL, so
+    large changesets are parsed in a process pool that scales across cores.
+    Workers are spawned rather than forked so they don't inherit the loaded
+    model and torch's thread pools; they only run code_parser.parse_file, so
+    they never import the embedding stack. Small changesets use threads, which
+    start instantly and still overlap the file reads.
+    """
+    max_workers = os.cpu_count() or 1
+    if num_files >= PROCESS_POOL_MIN_FILES and max_workers > 1:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up_parser,
+        )
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def _read_and_parse_files(
+    repo_local_path: str, file_paths: List[str]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Reads files from the repository and extracts their code chunks concurrently.
+
+    Missing, empty and oversized files are skipped before being read. The raw
+    bytes are parsed without a UTF-8 decode and re-encode of the whole file.
+
+    Args:
+        repo_local_path: The local path to the repository.
+        file_paths: Paths of the files relative to the repository root.
+
+    Returns:
+        A tuple of the non-empty chunks of all files, in file_paths order, and
+        the error messages of the files that could not be read or parsed.
+    """
+    chunks = []
+    errors = []
+    max_file_bytes = get_settings().MAX_FILE_BYTES
+
+    with _parse_executor(len(file_paths)) as executor:
+        futures = []
+        for file_path in file_paths:
+            full_path = os.path.join(repo_local_path, file_path)
+            try:
+                size = os.path.getsize(full_path)
+            except FileNotFoundError:
+                logger.warning("File not found at %s. Skipping.", full_path)
+                continue
+            except OSError as e:
+                error_msg = f"IO error reading file {file_path}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                continue
+
+            # Skip empty files and huge generated ones before reading them
+            if not 0 < size <= max_file_bytes:
+                logger.debug("Skipping %s (%s bytes)", file_path, size)
+                continue
+            futures.append(
+                (file_path, executor.submit(parse_file, full_path, file_path))
+            )
+
+        for file_path, future in futures:
+            try:
+                file_chunks = future.result()
+            except IOError as e:
+                error_msg = f"IO error reading file {file_path}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                continue
+            except Exception as e:
+                error_msg = f"Error parsing file {file_path}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                continue
+
+            if not file_chunks:
+                logger.debug("No chunks extracted from %s. Skipping.", file_path)
+            chunks.extend(chunk for chunk in file_chunks if chunk["code"])
+
+    return chunks, errors
+
+
 def process_and_add_file_chunks(
     db_table,
     repo_url: str,
     repo_local_path: str,
     file_paths: List[str],
     embedding_model,
+    embedding_cache: Optional[Dict[str, np.ndarray]] = None,
 ) -> int:
     """
     Processes the content of the given files and adds the resulting chunks to the database.
@@ -174,6 +323,8 @@ def process_and_add_file_chunks(
         repo_local_path: The local path to the repository.
         file_paths: A list of file paths to process and add chunks for.
         embedding_model: The embedding model to use for generating embeddings.
+        embedding_cache: Stored embeddings keyed by chunk content hash. Chunks
+            found here are not re-encoded.
 
     Returns:
         The number of chunks added to the database.
@@ -187,89 +338,65 @@ def process_and_add_file_chunks(
         return 0
 
     added_chunks = 0
-    errors = []
-
-    for file_path in file_paths:
-        try:
-            # Build the full path to the file
-            full_path = os.path.join(repo_local_path, file_path)
-            if not os.path.exists(full_path):
-                logger.warning(f"File not found at {full_path}. Skipping.")
-                continue
+    # Chunks from every file are collected first so they can be embedded together
+    pending_chunks, errors = _read_and_parse_files(repo_local_path, file_paths)
+
+    if pending_chunks:
+        chunk_hashes = [content_hash(chunk["code"]) for chunk in pending_chunks]
+        embeddings_by_hash = dict(embedding_cache or {})
+
+        # Only chunks whose content has no stored embedding need to be encoded
+        missing = {}
+        for chunk, chunk_hash in zip(pending_chunks, chunk_hashes):
+            if chunk_hash not in embeddings_by_hash:
+                missing.setdefault(chunk_hash, chunk["code"])
+        logger.debug(
+            "Reusing stored embeddings for %s of %s chunks",
+            len(chunk_hashes) - len(missing),
+            len(chunk_hashes),
+        )
 
-            # Read the file content
-            try:
-                with open(full_path, "r", encoding="utf-8") as f:
-                    file_content = f.read()
-            except UnicodeDecodeError:
-                logger.warning(f"File {file_path} is not UTF-8 encoded. Skipping.")
-                continue
-            except IOError as e:
-                error_msg = f"IO error reading file {file_path}: {str(e)}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
-                continue
+        new_embeddings = None
+        if missing:
+            # Embed in batched forward passes rather than one call per chunk
+            new_embeddings = get_embeddings_batch(
+                list(missing.values()), embedding_model
+            )
+        if missing and new_embeddings is None:
+            errors.append(f"Error generating embeddings for {len(missing)} chunks")
+        else:
+            if missing:
+                embeddings_by_hash.update(zip(missing, new_embeddings))
+            # Stacked straight into the table's float16, so vectors reused from
+            # the table are not widened and narrowed again
+            embeddings = np.stack(
+                [embeddings_by_hash[chunk_hash] for chunk_hash in chunk_hashes],
+                dtype=np.float16,
+            )
+            record_batch = build_code_chunk_batch(
+                repo_url,
+                pending_chunks,
+                embeddings,
+                chunk_hashes,
+                store_code=get_settings().STORE_CHUNK_CODE,
+            )
 
-            # Extract chunks from the content
+            # Add chunks to the database
             try:
-                chunks = parse_and_extract_chunks(file_content, file_path)
-                if not chunks:
-                    logger.debug(f"No chunks extracted from {file_path}. Skipping.")
-                    continue
+                db_table.add(record_batch)
+                added_chunks = record_batch.num_rows
+                logger.debug(
+                    "Added %s chunks from %s files", added_chunks, len(file_paths)
+                )
             except Exception as e:
-                error_msg = f"Error parsing file {file_path}: {str(e)}"
+                error_msg = f"Error adding chunks to database: {str(e)}"
                 logger.warning(error_msg)
                 errors.append(error_msg)
-                continue
-
-            # Prepare data for the database
-            db_rows = []
-            for chunk in chunks:
-                try:
-                    # Generate embedding for the chunk
-                    embedding = get_embedding(chunk.content, embedding_model)
-
-                    # Create schema instance
-                    db_row = CodeChunkSchema(
-                        repo_url=repo_url,
-                        file_path=file_path,
-                        start_line=chunk.start_line,
-                        end_line=chunk.end_line,
-                        content=chunk.content,
-                        symbol_type=chunk.symbol_type,
-                        symbol_name=chunk.symbol_name,
-                        embedding=embedding,
-                    )
-                    db_rows.append(db_row.model_dump())
-                except Exception as e:
-                    error_msg = (
-                        f"Error generating embedding for chunk in {file_path}: {str(e)}"
-                    )
-                    logger.warning(error_msg)
-                    # Continue with other chunks even if one fails
-
-            # Add chunks to the database
-            if db_rows:
-                try:
-                    db_table.add(db_rows)
-                    added_chunks += len(db_rows)
-                    logger.debug(f"Added {len(db_rows)} chunks from {file_path}")
-                except Exception as e:
-                    error_msg = (
-                        f"Error adding chunks to database for {file_path}: {str(e)}"
-                    )
-                    logger.warning(error_msg)
-                    errors.append(error_msg)
-
-        except Exception as e:
-            error_msg = f"Unexpected error processing file {file_path}: {str(e)}"
-            logger.exception(error_msg)
-            errors.append(error_msg)
 
     # If any errors occurred but some chunks were still added, log the issues but don't fail
     if errors and added_chunks > 0:
         logger.warning(
-            f"Completed with {len(errors)} errors. Added {added_chunks} chunks."
+            "Completed with %s errors. Added %s chunks.", len(errors), added_chunks
         )
     # If only errors occurred and no chunks were added, raise an exception
     elif errors and added_chunks == 0:
@@ -303,9 +430,12 @@ def incremental_index_repository(
         VectorDBError: If operations with the vector database fail
     """
     logger.info(
-        f"--- Starting incremental indexing for repository: {repo_url} between {old_commit} and {new_commit} ---"
+        "--- Starting incremental indexing for repository: %s between %s and %s ---",
+        repo_url,
+        old_commit,
+        new_commit,
     )
-    logger.info(f"Comparing changes between {old_commit[:7]} and {new_commit[:7]}")
+    logger.info("Comparing changes between %s and %s", old_commit[:7], new_commit[:7])
     start_time = time.time()
 
     # Get settings using the singleton accessor
@@ -317,9 +447,8 @@ def incremental_index_repository(
     embedding_model_name = settings.EMBEDDING_MODEL_NAME
 
     # Derive a local path for the repo from its URL
-    repo_name = "/".join(repo_url.split("/")[-2:]).replace(".git", "")
     table_name = repo_url_to_table_name(repo_url)
-    local_repo_path = os.path.join(repo_clone_dir, repo_name)
+    local_repo_path = get_local_repo_path(repo_url, repo_clone_dir)
 
     # Initialize Services (Embedding Model and DB)
     logger.info("\nStep 1: Initializing services...")
@@ -330,7 +459,7 @@ def incremental_index_repository(
                 get_embedding_model()
             )  # Factory function handles model name from settings
             logger.debug(
-                f"Successfully initialized embedding model: {embedding_model_name}"
+                "Successfully initialized embedding model: %s", embedding_model_name
             )
         except Exception as e:
             error_msg = f"Failed to initialize embedding model '{embedding_model_name}': {str(e)}"
@@ -346,7 +475,7 @@ def incremental_index_repository(
                 logger.error(error_msg)
                 raise VectorDBError("table_creation", error_msg)
             logger.debug(
-                f"Successfully connected to vector DB and accessed table: {table_name}"
+                "Successfully connected to vector DB and accessed table: %s", table_name
             )
         except Exception as e:
             if not isinstance(e, VectorDBError):
@@ -365,7 +494,7 @@ def incremental_index_repository(
     logger.info("Services initialized successfully")
 
     # Clone or Pull Repository
-    logger.info(f"\nStep 2: Ensuring repository is up-to-date at {local_repo_path}...")
+    logger.info("\nStep 2: Ensuring repository is up-to-date at %s...", local_repo_path)
     try:
         repo = clone_or_pull_repository(repo_url, local_repo_path)
         if not repo:
@@ -401,8 +530,16 @@ def incremental_index_repository(
         stats["files_deleted"] = len(changed_files["deleted"])
 
         logger.info(
-            f"Found {stats['files_added']} added, {stats['files_modified']} modified, "
-            f"and {stats['files_deleted']} deleted Python files."
+            "Found %s added, %s modified, and %s deleted Python files.",
+            stats["files_added"],
+            stats["files_modified"],
+            stats["files_deleted"],
+        )
+
+        # Keep the embeddings of modified files' current chunks so that chunks
+        # whose content did not change are not re-encoded after the delete
+        embedding_cache = fetch_chunk_embeddings(
+            code_table, repo_url, changed_files["modified"]
         )
 
         # Process Deleted and Modified Files (remove from DB)
@@ -415,7 +552,7 @@ def incremental_index_repository(
                 )
                 stats["chunks_deleted"] = deleted_chunks
                 logger.info(
-                    f"Successfully removed {deleted_chunks} chunks from database"
+                    "Successfully removed %s chunks from database", deleted_chunks
                 )
             except Exception as e:
                 error_msg = f"Error removing file chunks from database: {str(e)}"
@@ -432,10 +569,17 @@ def incremental_index_repository(
             files_to_add = changed_files["added"] + changed_files["modified"]
             try:
                 added_chunks = process_and_add_file_chunks(
-                    code_table, repo_url, local_repo_path, files_to_add, embedding_model
+                    code_table,
+                    repo_url,
+                    local_repo_path,
+                    files_to_add,
+                    embedding_model,
+                    embedding_cache,
                 )
                 stats["chunks_added"] = added_chunks
-                logger.info(f"Successfully added {added_chunks} new chunks to database")
+                logger.info(
+                    "Successfully added %s new chunks to database", added_chunks
+                )
             except Exception as e:
                 error_msg = f"Error adding file chunks to database: {str(e)}"
                 logger.exception(error_msg)
@@ -443,11 +587,15 @@ def incremental_index_repository(
         else:
             logger.info("No files to add to database")
 
+        if stats["chunks_deleted"] or stats["chunks_added"]:
+            optimize_table(code_table, min_small_fragments=OPTIMIZE_MIN_SMALL_FRAGMENTS)
+            ensure_vector_index(code_table, settings.VECTOR_INDEX_MIN_ROWS)
+
         # Update total chunks count
         try:
             stats["total_chunks"] = len(code_table)
         except Exception as e:
-            logger.warning(f"Unable to get total chunk count: {str(e)}")
+            logger.warning("Unable to get total chunk count: %s", e)
             stats["total_chunks"] = -1  # Indicate count is unknown
 
     except (RepositoryIndexingError, RepositoryCloneError, VectorDBError):
@@ -464,19 +612,26 @@ def incremental_index_repository(
 
         # Log summary regardless of success/failure
         logger.info(
-            f"\n--- Incremental indexing finished in {stats['elapsed_time']:.2f} seconds. ---"
+            "\n--- Incremental indexing finished in %.2f seconds. ---",
+            stats["elapsed_time"],
         )
         logger.info("Summary:")
         logger.info(
-            f"  - Files: {stats['files_added']} added, {stats['files_modified']} modified, "
-            f"{stats['files_deleted']} deleted"
+            "  - Files: %s added, %s modified, %s deleted",
+            stats["files_added"],
+            stats["files_modified"],
+            stats["files_deleted"],
         )
         logger.info(
-            f"  - Chunks: {stats['chunks_deleted']} removed, {stats['chunks_added']} added"
+            "  - Chunks: %s removed, %s added",
+            stats["chunks_deleted"],
+            stats["chunks_added"],
         )
 
         if stats["total_chunks"] >= 0:
-            logger.info(f"Total rows in table '{table_name}': {stats['total_chunks']}")
+            logger.info(
+                "Total rows in table '%s': %s", table_name, stats["total_chunks"]
+            )
 
     return stats
 
@@ -501,9 +656,9 @@ if __name__ == "__main__":
 
     # Access settings through Singleton accessor
     settings = get_settings()
-    logger.info(f"Using REPO_CLONE_DIR: {settings.REPO_CLONE_DIR}")
-    logger.info(f"Using LANCEDB_PATH: {settings.LANCEDB_PATH}")
-    logger.info(f"Using EMBEDDING_MODEL_NAME: {settings.EMBEDDING_MODEL_NAME}")
+    logger.info("Using REPO_CLONE_DIR: %s", settings.REPO_CLONE_DIR)
+    logger.info("Using LANCEDB_PATH: %s", settings.LANCEDB_PATH)
+    logger.info("Using EMBEDDING_MODEL_NAME: %s", settings.EMBEDDING_MODEL_NAME)
 
     if (
         OLD_COMMIT_SHA == "<PASTE_OLD_COMMIT_SHA_HERE>"
@@ -514,4 +669,4 @@ if __name__ == "__main__":
         stats = incremental_index_repository(
             EXAMPLE_REPO_URL, OLD_COMMIT_SHA, NEW_COMMIT_SHA
         )
-        logger.info(f"Incremental indexing complete. Stats: {stats}")
+        logger.info("Incremental indexing complete. Stats: %s", stats)
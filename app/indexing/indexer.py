@@ -1,60 +1,226 @@
 import asyncio
 import logging
+import multiprocessing
 import os
 import time
-
-import requests
-
-from app.core.config import settings
-from app.indexing.code_parser import parse_and_extract_chunks
-from app.indexing.embedding_generator import get_embedding, get_embedding_model
-from app.storage.repo_manager import clone_or_pull_repository
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.indexing.code_parser import parse_file, warm_up_parser
+from app.indexing.embedding_generator import get_embedding_model, get_embeddings_batch
+from app.storage.repo_manager import (
+    clone_or_pull_repository,
+    get_local_repo_path,
+    get_repo_name,
+    list_tracked_files,
+)
 from app.storage.vector_store import (
-    CodeChunkSchema,
+    build_code_chunk_batch,
     create_code_table_if_not_exists,
     drop_table,
+    ensure_vector_index,
     get_lancedb_conn,
+    optimize_table,
 )
 from app.utils.general_utils import repo_url_to_table_name
+from app.utils.http_client import get_http_client
 
 logger = logging.getLogger("app")
 
+# Number of embedded chunks buffered before they are written to LanceDB
+WRITE_BATCH_ROWS = 10_000
+
 
 async def _process_single_file(
-    file_path: str, local_repo_path: str, repo_url: str, embedding_model
-) -> list[CodeChunkSchema]:
-    """Helper function to process a single file asynchronously."""
+    file_path: str, local_repo_path: str, pool: ProcessPoolExecutor
+) -> list[dict]:
+    """Helper function to read and parse a single file in the process pool."""
     relative_file_path = os.path.relpath(file_path, local_repo_path)
-    logger.info(f"  - Processing file: {relative_file_path}")
-    file_chunks = []
+    logger.debug("  - Processing file: %s", relative_file_path)
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = await asyncio.to_thread(f.read)
+        # CPU-bound: run in a worker process so files parse on all cores
+        code_chunks_data = await asyncio.get_running_loop().run_in_executor(
+            pool, parse_file, file_path, relative_file_path
+        )
+        return [chunk_data for chunk_data in code_chunks_data if chunk_data["code"]]
+    except Exception as e:
+        logger.error("    - Error processing file %s: %s", relative_file_path, e)
+        return []
+
 
-        # CPU-bound: run in a separate thread
-        code_chunks_data = await asyncio.to_thread(
-            parse_and_extract_chunks, relative_file_path, content
+def _discover_python_files(repo, local_repo_path: str) -> list[str]:
+    """
+    Returns absolute paths of the repository's Python files.
+
+    Tracked files are listed from the Git index, which skips untracked and
+    ignored trees. If that fails, the working tree is walked instead.
+    """
+    try:
+        return [
+            os.path.join(local_repo_path, file_path)
+            for file_path in list_tracked_files(repo)
+        ]
+    except Exception as e:
+        logger.warning("Could not list tracked files, walking the clone: %s", e)
+
+    python_files = []
+    for root, dirs, files in os.walk(local_repo_path):
+        # Prune in place so os.walk never descends into the git metadata
+        dirs[:] = [d for d in dirs if d != ".git"]
+        python_files.extend(
+            os.path.join(root, file) for file in files if file.endswith(".py")
         )
+    return python_files
 
-        for chunk_data in code_chunks_data:
-            # CPU-bound: run in a separate thread
-            embedding = await asyncio.to_thread(
-                get_embedding, chunk_data["code"], embedding_model
-            )
-            if embedding is not None:
-                chunk_schema_item = CodeChunkSchema(
-                    id=chunk_data["id"],
-                    repo_url=repo_url,
-                    file_path=chunk_data["file_path"],
-                    code_chunk=chunk_data["code"],
-                    embedding=embedding,
-                    start_line=chunk_data["start_line"],
-                    end_line=chunk_data["end_line"],
+
+async def _parse_embed_and_write_files(
+    file_paths: list[str],
+    local_repo_path: str,
+    embedding_model,
+    code_table,
+    repo_url: str,
+    store_code: bool = True,
+) -> int:
+    """
+    Parses files, embeds their chunks and writes them to LanceDB in a pipeline.
+
+    One producer task per core takes files in turn, parses them in a process
+    pool and pushes the chunks onto a bounded queue. A single consumer embeds
+    them in batches of EMBEDDING_BATCH_SIZE while parsing continues, so the
+    model is fed full batches and I/O and parsing overlap with inference. Every WRITE_BATCH_ROWS
+    embedded rows are handed to a writer task through a second bounded queue,
+    so LanceDB writes overlap with the next batches' inference and memory use
+    stays bounded regardless of the repository size.
+
+    Args:
+        file_paths: Absolute paths of the files to process.
+        local_repo_path: The local path to the repository.
+        embedding_model: The embedding model to use for generating embeddings.
+        code_table: The LanceDB table to write the chunks to.
+        repo_url: The repository URL stored with every chunk.
+        store_code: Whether to store the chunk source text, see STORE_CHUNK_CODE.
+
+    Returns:
+        The number of chunks written to the table.
+    """
+    batch_size = get_settings().EMBEDDING_BATCH_SIZE
+    num_workers = os.cpu_count() or 1
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=4 * batch_size)
+    # Shared by the producers, each of which pulls its next file when done
+    pending_files = iter(file_paths)
+
+    async def produce() -> None:
+        for file_path in pending_files:
+            chunks = await _process_single_file(file_path, local_repo_path, pool)
+            for chunk in chunks:
+                await chunk_queue.put(chunk)
+
+    async def produce_all() -> None:
+        try:
+            # One producer per pool worker: a fixed number of tasks however
+            # many files the repository has
+            await asyncio.gather(*(produce() for _ in range(num_workers)))
+        finally:
+            # Sentinel: tells the consumer that no more chunks will arrive
+            await chunk_queue.put(None)
+
+    # Bounded so that embedding stalls instead of buffering if writes fall behind
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    # Embeddings are copied straight into a preallocated float32 buffer per write
+    # batch, which is converted to the table's float16 in one pass when the Arrow
+    # batch is built. A flush usually happens less than batch_size rows past
+    # WRITE_BATCH_ROWS.
+    buffer_shape = (
+        WRITE_BATCH_ROWS + batch_size,
+        embedding_model.get_embedding_dimension(),
+    )
+    pending_chunks = []
+    pending_embeddings = np.empty(buffer_shape, dtype=np.float32)
+    rows_written = 0
+
+    async def write_pending() -> None:
+        nonlocal pending_chunks, pending_embeddings
+        await write_queue.put(
+            (pending_chunks, pending_embeddings[: len(pending_chunks)])
+        )
+        pending_chunks = []
+        pending_embeddings = np.empty(buffer_shape, dtype=np.float32)
+
+    async def write_all() -> None:
+        nonlocal rows_written
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            chunks, embeddings = item
+            try:
+                # A single Arrow RecordBatch avoids converting the rows one by one
+                record_batch = build_code_chunk_batch(
+                    repo_url, chunks, embeddings, store_code=store_code
                 )
-                file_chunks.append(chunk_schema_item)
-    except Exception as e:
-        logger.error(f"    - Error processing file {relative_file_path}: {e}")
-    return file_chunks
+                await asyncio.to_thread(code_table.add, record_batch)
+                rows_written += len(chunks)
+            except Exception as e:
+                logger.error("Error adding %s chunks to LanceDB: %s", len(chunks), e)
+
+    async def consume() -> None:
+        try:
+            await embed_all()
+        finally:
+            # Sentinel: tells the writer that no more batches will arrive
+            await write_queue.put(None)
+
+    async def embed_all() -> None:
+        nonlocal pending_embeddings
+        batch = []
+        # Duplicate texts are encoded once, so only distinct ones fill a batch
+        batch_texts = set()
+        while True:
+            chunk = await chunk_queue.get()
+            if chunk is not None:
+                batch.append(chunk)
+                batch_texts.add(chunk["code"])
+            if batch and (chunk is None or len(batch_texts) >= batch_size):
+                embeddings = await asyncio.to_thread(
+                    get_embeddings_batch,
+                    [chunk_data["code"] for chunk_data in batch],
+                    embedding_model,
+                    batch_size,
+                )
+                if embeddings is None:
+                    logger.error("Skipping %s chunks that failed to embed", len(batch))
+                else:
+                    start = len(pending_chunks)
+                    if start + len(batch) > len(pending_embeddings):
+                        # Batches full of duplicate chunks can outgrow the buffer
+                        grown = np.empty(
+                            (start + len(batch), buffer_shape[1]), dtype=np.float32
+                        )
+                        grown[:start] = pending_embeddings[:start]
+                        pending_embeddings = grown
+                    pending_embeddings[start : start + len(batch)] = embeddings
+                    pending_chunks.extend(batch)
+                batch = []
+                batch_texts = set()
+            if pending_chunks and (
+                chunk is None or len(pending_chunks) >= WRITE_BATCH_ROWS
+            ):
+                await write_pending()
+            if chunk is None:
+                return
+
+    # Workers are spawned rather than forked so they don't inherit the loaded
+    # model and torch's thread pools; each sets up its tree-sitter parser once.
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_up_parser,
+    ) as pool:
+        await asyncio.gather(produce_all(), consume(), write_all())
+
+    return rows_written
 
 
 async def index_repository(repo_url: str):
@@ -64,24 +230,23 @@ async def index_repository(repo_url: str):
     Args:
         repo_url: The URL of the Git repository to index.
     """
-    logger.info(f"--- Starting indexing process for repository: {repo_url} ---")
+    logger.info("--- Starting indexing process for repository: %s ---", repo_url)
     start_time = time.time()
 
     # 1. Load Configuration from Pydantic settings
+    settings = get_settings()
     repo_clone_dir = settings.REPO_CLONE_DIR
     lancedb_path = settings.LANCEDB_PATH
-    embedding_model_name = settings.EMBEDDING_MODEL_NAME
 
     # Derive a local path for the repo from its URL
-    repo_name = "/".join(repo_url.split("/")[-2:]).replace(".git", "")
+    repo_name = get_repo_name(repo_url)
     table_name = repo_url_to_table_name(repo_url)
-
-    local_repo_path = os.path.join(repo_clone_dir, repo_name)
+    local_repo_path = get_local_repo_path(repo_url, repo_clone_dir)
 
     # 2. Initialize Services (Embedding Model and DB)
     logger.info("\nStep 1: Initializing services...")
     try:
-        embedding_model = get_embedding_model(embedding_model_name)
+        embedding_model = get_embedding_model()
         db_conn = get_lancedb_conn(lancedb_path)
         # Drop the table to ensure a clean run, making the process idempotent
         drop_table(db_conn, table_name)
@@ -93,66 +258,71 @@ async def index_repository(repo_url: str):
             logger.error("Error: Failed to create or open LanceDB table. Aborting.")
             return
     except Exception as e:
-        logger.error(f"Error during service initialization: {e}. Aborting.")
+        logger.error("Error during service initialization: %s. Aborting.", e)
         return
     logger.info("Services initialized successfully.")
 
     # 3. Clone or Pull Repository
-    logger.info(f"\nStep 2: Cloning/pulling repository into {local_repo_path}...")
+    logger.info("\nStep 2: Cloning/pulling repository into %s...", local_repo_path)
     repo = clone_or_pull_repository(repo_url, local_repo_path)
     if not repo:
         logger.error("Error: Failed to clone repository. Aborting.")
         return
     logger.info("Repository ready.")
 
-    # 4. Walk Filesystem, Parse, Embed, and Prepare Data
+    # 4. List the tracked Python files
     logger.info("\nStep 3: Discovering files and preparing for parallel processing...")
     python_files_to_process = []
-    for root, _, files in os.walk(local_repo_path):
-        if ".git" in root:
-            continue
-        for file in files:
-            if file.endswith(".py"):
-                python_files_to_process.append(os.path.join(root, file))
-
-    logger.info(f"Found {len(python_files_to_process)} Python files to process.")
-    logger.info("Starting parallel processing of files...")
-
-    tasks = [
-        _process_single_file(file_path, local_repo_path, repo_url, embedding_model)
-        for file_path in python_files_to_process
-    ]
+    files_skipped = 0
+    for file_path in _discover_python_files(repo, local_repo_path):
+        # Skip empty files and huge generated ones before reading them
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        if 0 < size <= settings.MAX_FILE_BYTES:
+            python_files_to_process.append(file_path)
+        else:
+            logger.debug("Skipping %s (%s bytes)", file_path, size)
+            files_skipped += 1
 
-    all_chunks_from_tasks = await asyncio.gather(*tasks)
+    logger.info(
+        "Found %s Python files to process, skipped %s empty or too large.",
+        len(python_files_to_process),
+        files_skipped,
+    )
+    logger.info("Starting parallel processing of files...")
 
-    all_chunks_to_add = []
-    for file_chunk_list in all_chunks_from_tasks:
-        all_chunks_to_add.extend(file_chunk_list)
+    # 5. Parse, embed and write the chunks to LanceDB in batches
+    logger.info("\nStep 4: Parsing, embedding and adding data to LanceDB...")
+    chunks_added = await _parse_embed_and_write_files(
+        python_files_to_process,
+        local_repo_path,
+        embedding_model,
+        code_table,
+        repo_url,
+        store_code=settings.STORE_CHUNK_CODE,
+    )
     files_processed = len(python_files_to_process)
 
     logger.info(
-        f"Data preparation complete. Found {len(all_chunks_to_add)} chunks in {files_processed} Python files."
+        "Successfully added %s chunks from %s Python files to the '%s' table.",
+        chunks_added,
+        files_processed,
+        table_name,
     )
 
-    # 5. Batch Insert into LanceDB
-    if all_chunks_to_add:
-        logger.info("\nStep 4: Adding data to LanceDB...")
-        try:
-            # LanceDB's add method can take a list of Pydantic objects directly
-            code_table.add(all_chunks_to_add)
-            logger.info(
-                f"Successfully added {len(all_chunks_to_add)} chunks to the '{table_name}' table."
-            )
-        except Exception as e:
-            logger.error(f"Error adding data to LanceDB: {e}")
-    else:
-        logger.info("\nStep 4: No new chunks to add to LanceDB.")
+    # Merge the per-batch fragments so searches don't pay for many small files
+    await asyncio.to_thread(optimize_table, code_table)
+    await asyncio.to_thread(
+        ensure_vector_index, code_table, settings.VECTOR_INDEX_MIN_ROWS
+    )
 
     end_time = time.time()
     logger.info(
-        f"\n--- Indexing process finished in {end_time - start_time:.2f} seconds. ---"
+        "\n--- Indexing process finished in %.2f seconds. ---", end_time - start_time
     )
-    logger.info(f"Total rows in table '{table_name}': {len(code_table)}")
+    logger.info("Total rows in table '%s': %s", table_name, len(code_table))
 
     webhook_payload = {
         "event": "indexed",
@@ -166,18 +336,18 @@ async def index_repository(repo_url: str):
     # Send webhook notification if URL is configured
     if settings.WEBHOOK_URL:
         try:
-            logger.info(f"Sending webhook notification to {settings.WEBHOOK_URL}")
-            response = requests.post(
+            logger.info("Sending webhook notification to %s", settings.WEBHOOK_URL)
+            response = await get_http_client().post(
                 settings.WEBHOOK_URL,
                 json=webhook_payload,
                 headers={"Content-Type": "application/json"},
             )
             response.raise_for_status()  # Raise exception for 4XX/5XX responses
             logger.info(
-                f"Webhook notification sent successfully: {response.status_code}"
+                "Webhook notification sent successfully: %s", response.status_code
             )
         except Exception as e:
-            logger.error(f"Failed to send webhook notification: {e}")
+            logger.error("Failed to send webhook notification: %s", e)
     else:
         logger.debug("No webhook URL configured, skipping notification")
 
@@ -203,9 +373,10 @@ if __name__ == "__main__":
     # We can check for required settings if needed, Pydantic does this on instantiation of Settings()
     # For example, GITHUB_APP_ID and GITHUB_PRIVATE_KEY are mandatory in Settings class.
     # If they are not set in .env or environment, Settings() would raise an error.
+    settings = get_settings()
 
-    logger.info(f"Using REPO_CLONE_DIR: {settings.REPO_CLONE_DIR}")
-    logger.info(f"Using LANCEDB_PATH: {settings.LANCEDB_PATH}")
-    logger.info(f"Using EMBEDDING_MODEL_NAME: {settings.EMBEDDING_MODEL_NAME}")
+    logger.info("Using REPO_CLONE_DIR: %s", settings.REPO_CLONE_DIR)
+    logger.info("Using LANCEDB_PATH: %s", settings.LANCEDB_PATH)
+    logger.info("Using EMBEDDING_MODEL_NAME: %s", settings.EMBEDDING_MODEL_NAME)
 
     asyncio.run(index_repository(EXAMPLE_REPO_URL))
@@ -0,0 +1,46 @@
+"""
+Shared SQLite plumbing for the indexing caches.
+
+The chunk and embedding caches only hold derived data in a local SQLite file;
+this module opens that file the same way for both.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteCache:
+    """
+    Base class for caches stored in a local SQLite database.
+
+    Each thread uses its own connection in autocommit mode, and the database
+    runs in WAL mode so several workers can read and write it concurrently.
+    Subclasses set SCHEMA to the statement creating their table.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path of the SQLite database file, created on first use.
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening the database if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self.SCHEMA)
+            self._local.conn = conn
+        return conn
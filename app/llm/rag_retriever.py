@@ -1,13 +1,12 @@
 import logging
 from typing import Dict, List
 
-from app.core.config import settings
+from app.core.config import get_settings
 from app.indexing.embedding_generator import get_embedding, get_embedding_model
+from app.storage.repo_manager import fill_missing_chunk_code
 from app.storage.vector_store import get_lancedb_conn
 from app.utils.general_utils import repo_url_to_table_name
 
-# --- Configuration ---
-LANCEDB_PATH = settings.LANCEDB_PATH
 logger = logging.getLogger("app")
 
 
@@ -30,7 +29,8 @@ def retrieve_relevant_code_chunks(
     """Retrieves relevant code chunks from the vector store for a given file diff."""
     logger.info(f"RAG: Starting retrieval for {file_path} in {repo_url}")
     try:
-        db_conn = get_lancedb_conn(LANCEDB_PATH)
+        settings = get_settings()
+        db_conn = get_lancedb_conn(settings.LANCEDB_PATH)
         table_name = repo_url_to_table_name(repo_url)
 
         if table_name not in db_conn.table_names():
@@ -55,6 +55,9 @@ def retrieve_relevant_code_chunks(
         )
 
         logger.info(f"RAG: Found {len(search_results)} relevant code chunks.")
+
+        # Chunks indexed without their source text are read back from the clone
+        fill_missing_chunk_code(search_results, settings.REPO_CLONE_DIR)
         return format_retrieved_chunks(search_results)
 
     except Exception as e:
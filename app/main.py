@@ -9,18 +9,18 @@ The application is structured using FastAPI best practices including:
 - Proper exception handling and logging
 """
 
-import os
-
-# Set tokenizers parallelism to avoid deadlocks with forked processes
-os.environ["TOKENIZERS_PARALLELISM"] = "false"
+import asyncio
 
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.dependencies import get_settings
 from app.api.routes import api_router
 from app.core.config import Settings
 from app.core.logging_config import get_logger, setup_logging
+from app.indexing.embedding_generator import warm_up_embedding_model
+from app.utils.http_client import close_http_client
 
 # Initialize logging
 setup_logging()
@@ -41,6 +41,7 @@ def create_application(settings: Settings = Depends(get_settings)) -> FastAPI:
         title="Code Reviewer API",
         description="API for code review automation with RAG and LLM capabilities",
         version="1.0.0",
+        default_response_class=ORJSONResponse,
     )
 
     # Add CORS middleware
@@ -58,10 +59,21 @@ def create_application(settings: Settings = Depends(get_settings)) -> FastAPI:
     @application.on_event("startup")
     async def startup_event():
         logger.info("Starting Code Reviewer API")
+        if get_settings().EMBEDDING_WARMUP:
+            # Load the model off the event loop before the first webhook needs it.
+            # A failure (e.g. the model download) must not keep the API from
+            # starting; the model is then loaded on first use instead.
+            try:
+                await asyncio.to_thread(warm_up_embedding_model)
+            except Exception as e:
+                logger.exception(
+                    "Embedding model warm-up failed, loading it on first use: %s", e
+                )
 
     @application.on_event("shutdown")
     async def shutdown_event():
         logger.info("Shutting down Code Reviewer API")
+        await close_http_client()
 
     return application
 
@@ -5,8 +5,9 @@ from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 # Import the necessary functions from our other modules
-from app.embedding_generator import get_embedding, get_embedding_model
-from app.vector_store import get_lancedb_conn
+from app.indexing.embedding_generator import EmbeddingModelFactory, get_embedding
+from app.storage.repo_manager import fill_missing_chunk_code
+from app.storage.vector_store import get_lancedb_conn
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,6 +23,7 @@ class CodeQueryEngine:
         lancedb_path: str = None,
         embedding_model_name: str = None,
         table_name: str = "code_embeddings",
+        repo_clone_dir: str = None,
     ):
         """
         Initialize the query engine with the LanceDB connection and embedding model.
@@ -30,6 +32,8 @@ class CodeQueryEngine:
             lancedb_path: Path to the LanceDB database. If None, uses the LANCEDB_PATH env var.
             embedding_model_name: Name of the embedding model to use. If None, uses the EMBEDDING_MODEL_NAME env var.
             table_name: Name of the table containing the code embeddings.
+            repo_clone_dir: Directory of the repository clones, used to read the code
+                of chunks indexed without it. If None, uses the REPO_CLONE_DIR env var.
         """
         # Load configuration from environment variables if not provided
         self.lancedb_path = lancedb_path or os.getenv(
@@ -39,9 +43,12 @@ class CodeQueryEngine:
             "EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"
         )
         self.table_name = table_name
+        self.repo_clone_dir = repo_clone_dir or os.getenv("REPO_CLONE_DIR", "./repos")
 
         # Initialize the embedding model
-        self.embedding_model = get_embedding_model(self.embedding_model_name)
+        self.embedding_model = EmbeddingModelFactory.get_model(
+            self.embedding_model_name
+        )
 
         # Connect to LanceDB
         self.db_conn = get_lancedb_conn(self.lancedb_path)
@@ -98,6 +105,8 @@ class CodeQueryEngine:
                 )
                 .to_list()
             )
+            # Chunks indexed without their source text are read back from the clone
+            fill_missing_chunk_code(results, self.repo_clone_dir)
             return results
         except Exception as e:
             print(f"Error performing search: {e}")
@@ -7,8 +7,7 @@ repository installation, push events, and pull request review events.
 import asyncio
 from typing import Any, Dict, List, Tuple
 
-import requests
-from requests.exceptions import RequestException
+import httpx
 
 from app.core.config import get_settings
 from app.core.exceptions import (
@@ -21,6 +20,7 @@ from app.indexing.incremental_indexer import incremental_index_repository
 from app.indexing.indexer import index_repository
 from app.services.llm_service import generate_review_for_file
 from app.utils.diff_parser import parse_diff
+from app.utils.http_client import get_http_client
 
 # Get logger for this module
 logger = get_logger(__name__)
@@ -57,7 +57,7 @@ async def process_installation_event(full_name: str) -> None:
                     "repository": full_name,
                 }
 
-                response = requests.post(
+                response = await get_http_client().post(
                     settings.WEBHOOK_URL,
                     json=webhook_payload,
                     headers={"Content-Type": "application/json"},
@@ -66,7 +66,7 @@ async def process_installation_event(full_name: str) -> None:
                 logger.info(
                     f"Installation notification sent successfully: {response.status_code}"
                 )
-            except RequestException as e:
+            except httpx.HTTPError as e:
                 logger.warning(f"Failed to send installation notification: {str(e)}")
                 # Don't raise here, as the main operation succeeded
     except Exception as e:
@@ -75,6 +75,40 @@ async def process_installation_event(full_name: str) -> None:
         raise RepositoryIndexingError(repo_url, str(e)) from e
 
 
+async def process_installation_batch(full_names: List[str]) -> None:
+    """
+    Index all repositories of an installation event from a single background task.
+
+    Repositories are indexed concurrently, bounded by
+    INSTALLATION_INDEX_CONCURRENCY. A failure on one repository is logged and
+    does not stop the others.
+
+    Args:
+        full_names: Full names of the GitHub repositories (owner/repo)
+    """
+    semaphore = asyncio.Semaphore(get_settings().INSTALLATION_INDEX_CONCURRENCY)
+
+    async def _bounded(full_name: str) -> None:
+        async with semaphore:
+            await process_installation_event(full_name)
+
+    results = await asyncio.gather(
+        *(_bounded(full_name) for full_name in full_names), return_exceptions=True
+    )
+    failed = [
+        full_name
+        for full_name, result in zip(full_names, results)
+        if isinstance(result, BaseException)
+    ]
+    if failed:
+        logger.error(
+            "Installation indexing failed for %d of %d repositories: %s",
+            len(failed),
+            len(full_names),
+            ", ".join(failed),
+        )
+
+
 async def process_push_event(push_info: Dict[str, Any]) -> None:
     """
     Process a push event by triggering the incremental indexing pipeline.
@@ -205,7 +239,7 @@ async def handle_pull_request_event(
                 comment_text = comment.get("comment")
 
                 # Map the line number to its position in the diff
-                position = file_diff.line_mapping.get(line_number)
+                position = file_diff.position_for(line_number)
 
                 if position and comment_text:
                     all_inline_comments.append(
@@ -245,7 +279,7 @@ async def handle_pull_request_event(
                     "inline_comments": all_inline_comments,
                 }
 
-                response = requests.post(
+                response = await get_http_client().post(
                     settings.WEBHOOK_URL,
                     json=webhook_payload,
                     headers={"Content-Type": "application/json"},
@@ -254,7 +288,7 @@ async def handle_pull_request_event(
                 logger.info(
                     f"Webhook notification sent successfully: {response.status_code}"
                 )
-            except RequestException as e:
+            except httpx.HTTPError as e:
                 error_msg = f"Failed to send webhook notification: {str(e)}"
                 logger.warning(error_msg)
                 # Don't raise here, as we still want to return the review results
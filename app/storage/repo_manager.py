@@ -1,12 +1,41 @@
 import logging
 import os
 import shutil
+from itertools import islice
+from typing import Any, Dict, List
 
 from git import GitCommandError, Repo
 
 logger = logging.getLogger("app")
 
 
+def get_repo_name(repo_url: str) -> str:
+    """
+    Returns the "<owner>/<name>" part of a repository URL.
+
+    Args:
+        repo_url: The URL of the Git repository.
+
+    Returns:
+        The owner and name of the repository, without a ".git" suffix.
+    """
+    return "/".join(repo_url.split("/")[-2:]).replace(".git", "")
+
+
+def get_local_repo_path(repo_url: str, clone_dir: str) -> str:
+    """
+    Returns the local clone directory of a repository, <clone_dir>/<owner>/<name>.
+
+    Args:
+        repo_url: The URL of the Git repository.
+        clone_dir: The directory holding all repository clones.
+
+    Returns:
+        The path of the repository's local clone.
+    """
+    return os.path.join(clone_dir, get_repo_name(repo_url))
+
+
 def clone_or_pull_repository(repo_url: str, local_path: str) -> Repo | None:
     """
     Clones a repository if it doesn't exist locally, or pulls the latest changes
@@ -56,6 +85,80 @@ def clone_or_pull_repository(repo_url: str, local_path: str) -> Repo | None:
         return None
 
 
+def list_tracked_files(repo: Repo, pathspec: str = "*.py") -> list[str]:
+    """
+    Lists the files tracked by Git that match a pathspec.
+
+    A single git ls-files call reads the index, so untracked and ignored trees
+    (virtualenvs, build output, caches) are never walked.
+
+    Args:
+        repo: The GitPython Repo object.
+        pathspec: Git pathspec to match; "*.py" matches at any depth.
+
+    Returns:
+        Paths of the matching files, relative to the repository root.
+
+    Raises:
+        GitCommandError: If git ls-files fails
+    """
+    output = repo.git.ls_files("-z", "--", pathspec)
+    return [path for path in output.split("\0") if path]
+
+
+def read_file_lines(
+    local_path: str, file_path: str, start_line: int, end_line: int
+) -> str | None:
+    """
+    Reads a range of lines from a file in a local repository clone.
+
+    Only lines up to end_line are read, so large files are not loaded whole.
+
+    Args:
+        local_path: The local directory of the repository.
+        file_path: Path of the file relative to the repository root.
+        start_line: First line to read (1-based, inclusive).
+        end_line: Last line to read (1-based, inclusive).
+
+    Returns:
+        The requested lines joined as a string, or None if the file cannot be read.
+    """
+    try:
+        with open(
+            os.path.join(local_path, file_path), "r", encoding="utf-8", errors="ignore"
+        ) as f:
+            return "".join(islice(f, start_line - 1, end_line)).rstrip("\n")
+    except OSError as e:
+        logger.warning(f"Could not read {file_path} from {local_path}: {e}")
+        return None
+
+
+def fill_missing_chunk_code(chunks: List[Dict[str, Any]], clone_dir: str) -> None:
+    """
+    Fills in the source text of chunks indexed without it.
+
+    Chunks stored with STORE_CHUNK_CODE disabled have an empty code_chunk; their
+    line range is read back from the repository clone. Chunks whose file cannot
+    be read are left with an empty code_chunk.
+
+    Args:
+        chunks: Search results with repo_url, file_path, start_line, end_line and
+            code_chunk fields, updated in place.
+        clone_dir: The directory holding all repository clones.
+    """
+    for chunk in chunks:
+        if not chunk.get("code_chunk"):
+            chunk["code_chunk"] = (
+                read_file_lines(
+                    get_local_repo_path(chunk["repo_url"], clone_dir),
+                    chunk["file_path"],
+                    chunk["start_line"],
+                    chunk["end_line"],
+                )
+                or ""
+            )
+
+
 # Example usage (optional, for testing this module directly)
 if __name__ == "__main__":
     from app.core.logging_config import setup_logging
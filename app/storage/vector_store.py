@@ -1,10 +1,15 @@
 import logging
 import os
-from typing import Optional
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
 
 import lancedb
+import numpy as np
+import pyarrow as pa
 from lancedb.pydantic import LanceModel, vector
 
+from app.utils.general_utils import content_hash
+
 logger = logging.getLogger("app")
 
 
@@ -13,9 +18,66 @@ class CodeChunkSchema(LanceModel):
     repo_url: str
     file_path: str
     code_chunk: str
-    embedding: vector(384)  # Dimension for 'all-MiniLM-L6-v2' or similar models.
+    # Dimension for 'all-MiniLM-L6-v2' or similar models. Stored as float16, half
+    # the bytes of float32 on disk and in every write and scan, without
+    # measurable loss in search recall.
+    embedding: vector(384, value_type=pa.float16())
     start_line: Optional[int] = None
     end_line: Optional[int] = None
+    chunk_hash: Optional[str] = None  # Content hash of code_chunk, to reuse embeddings
+
+
+def build_code_chunk_batch(
+    repo_url: str,
+    chunks: List[Dict[str, Any]],
+    embeddings: np.ndarray,
+    chunk_hashes: Optional[List[str]] = None,
+    store_code: bool = True,
+) -> pa.RecordBatch:
+    """
+    Builds an Arrow RecordBatch matching CodeChunkSchema from parsed chunks.
+
+    Columns are built directly from the chunk fields and the embedding matrix,
+    so rows are written to LanceDB without per-row Pydantic conversion.
+    Embeddings are converted to the schema's float16 in a single pass; LanceDB
+    widens them again when adding to a table created with float32 embeddings.
+
+    Args:
+        repo_url: The repository URL associated with the chunks.
+        chunks: Chunk dictionaries as returned by parse_and_extract_chunks.
+        embeddings: 2D array with one embedding row per chunk, in chunk order.
+        chunk_hashes: Content hashes of the chunks' code, in chunk order. Computed
+            when not given.
+        store_code: Whether to store the chunks' source text. When False the
+            code_chunk column is left empty and the code is read back from the
+            repository clone by line range.
+
+    Returns:
+        A RecordBatch with the CodeChunkSchema Arrow schema.
+    """
+    schema = CodeChunkSchema.to_arrow_schema()
+    if chunk_hashes is None:
+        chunk_hashes = [content_hash(chunk["code"]) for chunk in chunks]
+    # The column is float16; float16 input (e.g. reused stored vectors) is used
+    # as is, anything else is converted once here
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float16)
+    columns = {
+        "id": pa.array([chunk["id"] for chunk in chunks], pa.string()),
+        "repo_url": pa.array([repo_url] * len(chunks), pa.string()),
+        "file_path": pa.array([chunk["file_path"] for chunk in chunks], pa.string()),
+        "code_chunk": pa.array(
+            [chunk["code"] if store_code else "" for chunk in chunks], pa.string()
+        ),
+        "embedding": pa.FixedSizeListArray.from_arrays(
+            pa.array(embeddings.reshape(-1)), embeddings.shape[1]
+        ).cast(schema.field("embedding").type),
+        "start_line": pa.array([chunk["start_line"] for chunk in chunks], pa.int64()),
+        "end_line": pa.array([chunk["end_line"] for chunk in chunks], pa.int64()),
+        "chunk_hash": pa.array(chunk_hashes, pa.string()),
+    }
+    return pa.RecordBatch.from_arrays(
+        [columns[field.name] for field in schema], schema=schema
+    )
 
 
 def get_lancedb_conn(db_path: str):
@@ -41,6 +103,23 @@ def drop_table(db_connection, table_name: str):
         logger.info(f"Info: Could not drop table '{table_name}' (it may not exist).")
 
 
+def _ensure_file_path_index(table: lancedb.table.Table) -> None:
+    """
+    Creates a BTREE scalar index on file_path if the table has none.
+
+    The incremental indexer filters every lookup and delete by file_path; the
+    index lets LanceDB find the matching rows without scanning the column.
+    Rows added later are indexed by optimize_table.
+    """
+    try:
+        if any("file_path" in index.columns for index in table.list_indices()):
+            return
+        table.create_scalar_index("file_path", index_type="BTREE")
+        logger.info(f"Created file_path index on table '{table.name}'.")
+    except Exception as e:
+        logger.warning(f"Could not create file_path index on '{table.name}': {e}")
+
+
 def create_code_table_if_not_exists(
     db_connection, table_name: str
 ) -> Optional[lancedb.table.Table]:
@@ -64,6 +143,11 @@ def create_code_table_if_not_exists(
 
         logger.info(f"Opening table '{table_name}'...")
         tbl = db_connection.open_table(table_name)
+        if "chunk_hash" not in tbl.schema.names:
+            # Tables created before chunk hashes were stored get an empty column
+            logger.info(f"Adding 'chunk_hash' column to table '{table_name}'...")
+            tbl.add_columns({"chunk_hash": "CAST(NULL AS STRING)"})
+        _ensure_file_path_index(tbl)
         logger.info(f"Successfully opened table '{table_name}'.")
         return tbl
     except Exception as e:
@@ -71,6 +155,68 @@ def create_code_table_if_not_exists(
         return None
 
 
+def optimize_table(
+    table: lancedb.table.Table,
+    cleanup_older_than: timedelta = timedelta(days=1),
+    min_small_fragments: int = 0,
+) -> None:
+    """
+    Compacts a table's data files and prunes its old versions.
+
+    Every add or delete leaves new fragments and a new table version behind;
+    compacting them keeps search latency stable as incremental updates pile up.
+    Failures are logged and not raised, as the table stays usable without it.
+
+    Args:
+        table: The LanceDB table to optimize.
+        cleanup_older_than: Table versions older than this are removed.
+        min_small_fragments: Skip optimizing until the table has at least this
+            many small fragments, so frequent small writes are compacted in one
+            pass rather than after each write. 0 always optimizes.
+    """
+    try:
+        if min_small_fragments:
+            fragment_stats = table.stats()["fragment_stats"]
+            if fragment_stats["num_small_fragments"] < min_small_fragments:
+                return
+        table.optimize(cleanup_older_than=cleanup_older_than)
+        logger.info(f"Optimized table '{table.name}'.")
+    except Exception as e:
+        logger.warning(f"Could not optimize table '{table.name}': {e}")
+
+
+def ensure_vector_index(table: lancedb.table.Table, min_rows: int) -> None:
+    """
+    Builds a scalar-quantized ANN index on the embedding column once it pays off.
+
+    IVF_HNSW_SQ stores each vector as int8 codes, half the size of the float16
+    column, so searches read a fraction of the bytes with near-exact distances.
+    Small tables are searched faster by a flat scan, so no index is built below
+    min_rows. Once built, optimize_table keeps it up to date with new rows.
+    Failures are logged and not raised, as searches fall back to a flat scan.
+
+    Args:
+        table: The LanceDB code chunk table.
+        min_rows: Minimum number of rows before an index is built; 0 disables
+            indexing.
+    """
+    try:
+        if not min_rows or any(
+            "embedding" in index.columns for index in table.list_indices()
+        ):
+            return
+        num_rows = table.count_rows()
+        if num_rows < min_rows:
+            return
+        logger.info(f"Building vector index on '{table.name}' ({num_rows} rows)...")
+        table.create_index(
+            metric="l2", vector_column_name="embedding", index_type="IVF_HNSW_SQ"
+        )
+        logger.info(f"Built vector index on '{table.name}'.")
+    except Exception as e:
+        logger.warning(f"Could not build vector index on '{table.name}': {e}")
+
+
 # Example usage (optional, for testing this module directly)
 if __name__ == "__main__":
     from app.core.logging_config import setup_logging
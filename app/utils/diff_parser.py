@@ -1,5 +1,9 @@
 import logging
+import re
+from array import array
+from bisect import bisect_left
 from dataclasses import dataclass, field
+from typing import Optional
 
 
 @dataclass
@@ -8,45 +12,76 @@ class FileDiff:
 
     path: str
     content: str
-    # Maps line number in the new file to its 1-based position in the diff
-    line_mapping: dict[int, int] = field(default_factory=dict)
+    # Added line numbers in the new file, ascending, with their 1-based positions
+    # in the diff at the same index
+    new_lines: array = field(default_factory=lambda: array("i"))
+    positions: array = field(default_factory=lambda: array("i"))
+
+    def position_for(self, line_num: int) -> Optional[int]:
+        """
+        Get the position in the diff of an added line.
+
+        Args:
+            line_num: Line number in the new file
+
+        Returns:
+            The 1-based position of the line in the diff, or None if the line
+            was not added in this diff
+        """
+        if not isinstance(line_num, int):
+            return None
+        index = bisect_left(self.new_lines, line_num)
+        if index < len(self.new_lines) and self.new_lines[index] == line_num:
+            return self.positions[index]
+        return None
 
 
 logger = logging.getLogger("app")
 
+# Matches a per-file header line; group 1 is the 'b' path, which is the new file path
+_DIFF_HEADER_RE = re.compile(r"^diff --git a/.*? b/(.*)$", re.MULTILINE)
+
+# Matches a hunk header such as "@@ -1,13 +1,15 @@"; group 1 is the new-file start
+_HUNK_HEADER_RE = re.compile(r"@@ -\d+(?:,\d+)? \+(\d+)")
+
 
 def parse_diff(diff_text: str) -> list[FileDiff]:
     """
     Parses a unified diff into FileDiff objects, calculating the position
     of each added or modified line within the diff for commenting.
     """
-    file_diffs_raw = diff_text.split("diff --git ")[1:]
+    headers = list(_DIFF_HEADER_RE.finditer(diff_text))
     parsed_diffs = []
 
-    for file_diff_raw in file_diffs_raw:
+    for i, header in enumerate(headers):
+        # Each file's diff runs from its header up to the next header
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(diff_text)
         try:
-            lines = file_diff_raw.split("\n")
-            first_line = lines[0]
-            # Extract the 'b' path, which is the new file path
-            path = first_line.split(" b/")[1].strip()
-
-            content = "diff --git " + file_diff_raw
+            path = header.group(1).strip()
+            content = diff_text[header.start() : end]
             file_diff_obj = FileDiff(path=path, content=content)
+            new_lines = file_diff_obj.new_lines
+            positions = file_diff_obj.positions
 
             position_in_diff = 0
             current_new_line_num = 0
 
-            for line in lines:
+            for line in content.split("\n"):
                 position_in_diff += 1
-                if line.startswith("@@"):
-                    # e.g., @@ -1,13 +1,15 @@
-                    hunk_info = line.split(" ")[2]
-                    current_new_line_num = int(hunk_info.split(",")[0][1:])
-                elif line.startswith("+") and not line.startswith("+++"):
-                    file_diff_obj.line_mapping[current_new_line_num] = position_in_diff
-                    current_new_line_num += 1
-                elif line.startswith(" ") and not line.startswith("---"):
+                # Dispatch on the first character instead of repeated startswith
+                first = line[:1]
+                if first == "+":
+                    if line[:3] != "+++":
+                        new_lines.append(current_new_line_num)
+                        positions.append(position_in_diff)
+                        current_new_line_num += 1
+                elif first == " ":
                     current_new_line_num += 1
+                elif first == "@" and line[:2] == "@@":
+                    hunk = _HUNK_HEADER_RE.match(line)
+                    if hunk is None:
+                        raise ValueError(f"Malformed hunk header: {line}")
+                    current_new_line_num = int(hunk.group(1))
 
             parsed_diffs.append(file_diff_obj)
         except (IndexError, ValueError) as e:
@@ -1,3 +1,4 @@
+import hashlib
 from typing import Any
 
 
@@ -5,3 +6,16 @@ def repo_url_to_table_name(url: Any) -> str:
     repo_name = "/".join(url.split("/")[-2:]).replace(".git", "")
     table_name = repo_name.replace("/", "_")
     return table_name
+
+
+def content_hash(text: str) -> str:
+    """
+    Compute a short, stable hash of a text's content.
+
+    Args:
+        text: The text to hash
+
+    Returns:
+        str: 32-character hex digest of the text
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
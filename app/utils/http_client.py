@@ -0,0 +1,37 @@
+"""
+Shared HTTP client for outbound requests.
+
+A single httpx.AsyncClient is reused across calls so connections (and their TLS
+sessions) are kept alive instead of being re-established for every request, and
+so requests made from async code never block the event loop.
+"""
+
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared AsyncClient, creating it on first use.
+
+    Returns:
+        httpx.AsyncClient: The shared client instance
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=32),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared AsyncClient if it has been created."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None